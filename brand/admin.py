@@ -1,5 +1,6 @@
 from django.contrib import admin
 from django.db.models.functions import Lower
+from django.forms.models import BaseInlineFormSet
 
 from brand.models import (
     Brand,
@@ -18,7 +19,47 @@ from brand.models import (
 )
 
 
+class BrandTagInlineFormSet(BaseInlineFormSet):
+    def full_clean(self):
+        # Forms validate against the categories loaded here in one query
+        if self.is_bound and self.instance.pk is not None:
+            BrandTag.prefetch_brand_categories(
+                [form.instance for form in self.forms]
+            )
+        super().full_clean()
+
+
+class BrandTagInline(admin.TabularInline):
+    model = BrandTag
+    formset = BrandTagInlineFormSet
+    extra = 0
+
+    def get_queryset(self, request):
+        # BrandTag.__str__ is shown for every row
+        return (
+            super()
+            .get_queryset(request)
+            .select_related("brand", "tag__category")
+        )
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name != "tag":
+            return super().formfield_for_foreignkey(
+                db_field, request, **kwargs
+            )
+
+        # Tag.__str__ shows the category of every option
+        kwargs["queryset"] = Tag.objects.select_related("category")
+        formfield = super().formfield_for_foreignkey(
+            db_field, request, **kwargs
+        )
+        # Loaded once per request for all rows instead of once per row
+        formfield.choices = list(formfield.choices)
+        return formfield
+
+
 class BrandAdmin(admin.ModelAdmin):
+    inlines = [BrandTagInline]
     exclude = (
         "user_rating",
         "brandscanner_rating",
@@ -4,3 +4,25 @@ from django.apps import AppConfig
 class BrandConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "brand"
+
+    def ready(self):
+        from django.db import connections, transaction
+        from django.db.models.signals import post_delete, post_save
+
+        from utilities.cache import bump_cache_generation
+
+        def data_changed(sender, using, **kwargs):
+            # One bump per transaction, however many objects it changes.
+            # Callbacks of rolled back savepoints are dropped from this
+            # list too, so a flag could not stay set by mistake.
+            if any(
+                func is bump_cache_generation
+                for _, func, _ in connections[using].run_on_commit
+            ):
+                return
+            # After commit, so a recomputation can not read the old data
+            transaction.on_commit(bump_cache_generation, using=using)
+
+        for model in self.get_models():
+            post_save.connect(data_changed, sender=model, weak=False)
+            post_delete.connect(data_changed, sender=model, weak=False)
@@ -0,0 +1,63 @@
+import contextlib
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from brand.models import Category
+from utilities.export import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, export_category
+from utilities.import_rules import CATEGORY__RULES
+
+
+class Command(BaseCommand):
+    help = "Exports the brands of a category in the import_category format"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--category", type=str)
+        parser.add_argument(
+            "--format", choices=EXPORT_FORMATS, default=EXPORT_FORMATS[0]
+        )
+        parser.add_argument(
+            "--output",
+            type=str,
+            default="-",
+            help="File to write to, - for stdout.",
+        )
+        parser.add_argument("--gzip", action="store_true")
+        parser.add_argument(
+            "--base-url",
+            type=str,
+            default="",
+            help="Prefix of image urls, needed to import them again.",
+        )
+        parser.add_argument(
+            "--chunk-size", type=int, default=EXPORT_CHUNK_SIZE
+        )
+
+    def handle(self, *args, **options):
+        category_name = options["category"]
+        if category_name not in CATEGORY__RULES:
+            raise CommandError(
+                f"No import rules for category {category_name}."
+            )
+
+        category = Category.objects.filter(internal_name=category_name).first()
+        if category is None:
+            raise CommandError(f"Category {category_name} does not exist.")
+
+        chunks = export_category(
+            category,
+            CATEGORY__RULES[category_name],
+            export_format=options["format"],
+            compress=options["gzip"],
+            base_url=options["base_url"],
+            chunk_size=max(options["chunk_size"], 1),
+        )
+
+        with contextlib.ExitStack() as stack:
+            if options["output"] == "-":
+                output = sys.stdout.buffer
+            else:
+                output = stack.enter_context(open(options["output"], "wb"))
+            for chunk in chunks:
+                output.write(chunk)
+            output.flush()
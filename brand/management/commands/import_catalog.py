@@ -0,0 +1,298 @@
+import collections
+import contextlib
+import json
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from brand.management.commands import import_category
+from brand.models import Category, Person
+from utilities.columnar import ColumnarError
+from utilities.import_rules import CATEGORY__RULES
+from utilities.import_validation import (
+    validate_columns,
+    validation_report_lines,
+)
+from utilities.imports import (
+    IMAGE_MANIFEST,
+    ImportRuleError,
+    compile_import_plan,
+    import_as_person,
+    plan_source_columns,
+)
+from utilities.journal import new_run_id
+from utilities.sheets import open_sheet
+from utilities.validators import is_existing_file
+
+LOG_DIR_NAME = "import_catalog"
+PERSON_BATCH_SIZE = 500
+
+
+def _load_manifest(manifest_path):
+    with open(manifest_path, encoding="utf-8") as manifest_file:
+        manifest = json.load(manifest_file)
+
+    sheets = []
+    for entry in manifest:
+        sheets.append((entry["category"], entry["csv"]))
+    return sheets
+
+
+def _import_partition(sheets, partition, log_path, import_options):
+    stats = collections.Counter()
+    failures = []
+
+    with open(log_path, "w", encoding="utf-8") as log:
+        with contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+            # Sheets run in manifest order so rows of a brand spread over
+            # several sheets are imported in the same order as serially
+            for category_name, csv_file_path in sheets:
+                print(f"\n######## {category_name} {csv_file_path} ########")
+                command = import_category.Command()
+                try:
+                    call_command(
+                        command,
+                        category=category_name,
+                        csv=csv_file_path,
+                        partition=partition,
+                        skip_validation=True,
+                        ignore_invalid=True,
+                        **import_options,
+                    )
+                except SystemExit as e:
+                    failures.append(
+                        (category_name, csv_file_path, f"exit code {e.code}")
+                    )
+                except Exception as e:
+                    failures.append((category_name, csv_file_path, repr(e)))
+
+                stats.update(getattr(command, "stats", {}))
+                for idx in getattr(command, "failed_rows", []):
+                    failures.append(
+                        (category_name, csv_file_path, f"row idx {idx}")
+                    )
+
+    connections.close_all()
+    return stats, failures
+
+
+class Command(BaseCommand):
+    help = "Imports several category CSVs in parallel"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--manifest",
+            type=str,
+            help='JSON list of {"category": ..., "csv": ...} entries.',
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count(),
+            help="Number of worker processes.",
+        )
+        parser.add_argument(
+            "--rate",
+            type=float,
+            default=0,
+            help="Image downloads per second per host, shared by all "
+            "workers. 0 means no limit.",
+        )
+        parser.add_argument(
+            "--host-concurrency",
+            type=int,
+            default=0,
+            help="Parallel image downloads per host. Each worker downloads "
+            "one image at a time, so this caps --workers. 0 means no limit.",
+        )
+        parser.add_argument("--refresh-images", action="store_true")
+        parser.add_argument("--update", action="store_true")
+        parser.add_argument("--resume", action="store_true")
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument("--ignore-invalid", action="store_true")
+
+    def handle(self, *args, **options):
+        workers = max(options["workers"], 1)
+        host_concurrency = options["host_concurrency"]
+        if host_concurrency and workers > host_concurrency:
+            # Each worker needs at least one download slot per host
+            print(
+                f"Using {host_concurrency} workers to stay within "
+                f"--host-concurrency {host_concurrency}."
+            )
+            workers = host_concurrency
+
+        if not is_existing_file(options["manifest"]):
+            sys.exit(1)
+        sheets = _load_manifest(options["manifest"])
+
+        # Every sheet is checked before any worker starts writing
+        import_plans = []
+        for category_name, csv_file_path in sheets:
+            import_plan = self.check_sheet(
+                category_name, csv_file_path, options["ignore_invalid"]
+            )
+            if import_plan is None:
+                sys.exit(1)
+            import_plans.append(import_plan)
+
+        # Workers split the rows by brand, so each brand is written by a
+        # single process. A person may appear under brands of different
+        # workers, so people are created up front, without their photos.
+        # The worker importing a person's row adds the photo.
+        IMAGE_MANIFEST.configure(refresh=options["refresh_images"])
+        stats = self.create_people(sheets, import_plans)
+
+        import_options = {
+            "update": options["update"],
+            "refresh_images": options["refresh_images"],
+            "resume": options["resume"],
+            "batch_size": options["batch_size"],
+            "rate": options["rate"] / workers,
+        }
+
+        log_dir = Path(settings.DATA_ROOT) / LOG_DIR_NAME
+        log_dir.mkdir(parents=True, exist_ok=True)
+        run_id = new_run_id()
+        log_paths = [
+            log_dir / f"{run_id}-{partition_idx}.log"
+            for partition_idx in range(workers)
+        ]
+
+        # Forked workers must not share the parent's database connections
+        connections.close_all()
+        sys.stdout.flush()
+
+        failures = []
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("fork"),
+        ) as executor:
+            futures = [
+                executor.submit(
+                    _import_partition,
+                    sheets,
+                    f"{partition_idx}/{workers}",
+                    log_paths[partition_idx],
+                    import_options,
+                )
+                for partition_idx in range(workers)
+            ]
+            for future in futures:
+                worker_stats, worker_failures = future.result()
+                stats.update(worker_stats)
+                failures.extend(worker_failures)
+
+        if stats:
+            print("Summary:")
+            print("\n".join(import_category.stats_lines(stats)))
+
+        if failures:
+            print(f"{len(failures)} failures:")
+            for category_name, csv_file_path, reason in failures:
+                print(f"{category_name} {csv_file_path}: {reason}")
+
+        print("Worker logs:")
+        print("\n".join(str(log_path) for log_path in log_paths))
+
+        # One full run instead of one per worker, which would race on the
+        # stamps file
+        if import_category.has_changes(stats):
+            call_command("prerender_pages")
+
+        if failures:
+            sys.exit(1)
+
+    def check_sheet(self, category_name, csv_file_path, ignore_invalid):
+        print(f"Checking {category_name} {csv_file_path}")
+
+        if not is_existing_file(csv_file_path):
+            return None
+
+        if category_name not in CATEGORY__RULES:
+            print(f"No import rules for category {category_name}.")
+            return None
+
+        if not Category.objects.filter(internal_name=category_name).exists():
+            print(f"Category {category_name} does not exist.")
+            return None
+
+        with contextlib.ExitStack() as stack:
+            try:
+                header, sheet_rows = stack.enter_context(
+                    open_sheet(csv_file_path)
+                )
+            except ColumnarError as e:
+                print(e)
+                return None
+
+            try:
+                import_plan = compile_import_plan(
+                    CATEGORY__RULES[category_name], header
+                )
+            except ImportRuleError as e:
+                print(f"Import rules do not match the CSV:\n{e}")
+                return None
+
+            columns = plan_source_columns(import_plan, header)
+            validation_report = validate_columns(
+                import_plan, sheet_rows(columns=columns), 0
+            )
+
+        if validation_report:
+            print("Invalid values found:")
+            print("\n".join(validation_report_lines(validation_report)))
+            if not ignore_invalid:
+                return None
+
+        return import_plan
+
+    def create_people(self, sheets, import_plans):
+        stats = collections.Counter()
+
+        # The first row of a person wins, like in a serial import
+        name__person = {}
+        for (_, csv_file_path), import_plan in zip(sheets, import_plans):
+            with open_sheet(csv_file_path) as (header, sheet_rows):
+                columns = plan_source_columns(import_plan, header)
+                for csv_row in sheet_rows(columns=columns):
+                    person = import_as_person(
+                        import_plan, csv_row, download_images=False
+                    )
+                    if person is not None:
+                        name__person.setdefault(person.name, person)
+
+        names = list(name__person)
+        for batch_start in range(0, len(names), PERSON_BATCH_SIZE):
+            batch_end = batch_start + PERSON_BATCH_SIZE
+            batch_names = names[batch_start:batch_end]
+            existing_names = set(
+                Person.objects.filter(name__in=batch_names).values_list(
+                    "name", flat=True
+                )
+            )
+
+            people = []
+            for name in batch_names:
+                person = name__person[name]
+                if name in existing_names:
+                    continue
+                try:
+                    person.full_clean()
+                except import_category.ROW_ERRORS as e:
+                    # The worker importing this row reports it again
+                    print(f"Could not create person {person}: {e!r}")
+                    continue
+                people.append(person)
+
+            Person.objects.bulk_create(people)
+            stats["Person created"] += len(people)
+
+        return stats
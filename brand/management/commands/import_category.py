@@ -1,7 +1,16 @@
+import collections
+import contextlib
+import copy
+import functools
+import itertools
+import json
+import logging
 import sys
-import time
 
-from django.core.management.base import BaseCommand
+import requests
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 
 from brand.models import (
     Brand,
@@ -13,9 +22,25 @@ from brand.models import (
     Category,
     Person,
 )
-from utilities.converters import csv_to_dict_list
+from utilities.cache import bump_cache_generation
+from utilities.columnar import ColumnarError
+from utilities.dates import current_india_time
+from utilities.import_diff import diff_import, report_lines
+from utilities.import_rules import CATEGORY__RULES
+from utilities.import_validation import (
+    validate_columns,
+    validation_report_lines,
+)
 from utilities.imports import (
     CHECK_IF_EXISTING,
+    DOWNLOAD_RATE_LIMITER,
+    IMAGE_MANIFEST,
+    ROW_ERRORS,
+    ImportRuleError,
+    brand_partition,
+    changed_fields,
+    compile_import_plan,
+    download_row_images,
     import_as_brand,
     import_as_brandcategory,
     import_as_brandkeyperson,
@@ -24,334 +49,57 @@ from utilities.imports import (
     import_as_brandvisual,
     import_as_person,
     import_remaining_brandassets,
+    plan_source_columns,
+    updatable_fields,
+    without_image_downloads,
+)
+from utilities.journal import (
+    file_fingerprint,
+    last_committed_row,
+    new_run_id,
+    open_journal,
+    record_checkpoint,
 )
-from utilities.validators import is_csv
-
-SHARED_RULES = {
-    "Brand": {
-        "pre": {"must": ["name"]},
-        "fields": {
-            # Basic
-            "name": {
-                "type": "text",
-                "source": "Name of Brand",
-            },
-            "title": {
-                "type": "text",
-                "source": "Title of Brand",
-                "default": "UNKNOWN",
-            },
-            "description": {
-                "type": "text",
-                "source": "Brand Info (less than 100 words)",
-                "default": "UNKNOWN",
-            },
-            "founding_year": {
-                "type": "number",
-                "source": "founded_in_year_cleaned",
-                "default": 2020,
-            },
-            "company_size": {
-                "type": "number",
-                "source": "Company Size",
-                "default": 1,
-            },
-            "location": {
-                "type": "enum",
-                "source": "Brand Location",
-                "choices": {
-                    "India": Brand.Location.INDIA,
-                    "International": Brand.Location.INTERNATIONAL,
-                },
-                "default": Brand.Location.INDIA,
-            },
-            # Shopping
-            "offline_presence": {
-                "type": "enum",
-                "source": "Available on offline stores",
-                "choices": {
-                    "Yes": True,
-                    "No": False,
-                },
-                "default": False,
-            },
-            "delivery_days": {
-                "type": "number",
-                "source": "Delivery (in days)",
-                "default": 7,
-            },
-            "return_days": {
-                "type": "number",
-                "source": "Returns ( In days)",
-                "default": 7,
-            },
-            "payment_mode": {
-                "type": "enum",
-                "source": "Payment",
-                "choices": {
-                    "Prepaid": Brand.PaymentMode.PREPAID_ONLY,
-                    "Payment on Delivery": Brand.PaymentMode.BOTH,
-                },
-            },
-            "refund_mode": {
-                "type": "enum",
-                "source": "Refund",
-                "choices": {
-                    "Exchange only": Brand.RefundMode.EXCHANGE_ONLY,
-                    "Not Applicable": Brand.RefundMode.NA,
-                },
-            },
-            # Communication
-            "website": {
-                "type": "url",
-                "source": "Website",
-                "default": "https://thebrandscanner.in",
-            },
-            "phone_number": {
-                "type": "text",
-                "source": "phone_number_cleaned",
-                "default": "UNKNOWN",
-            },
-            "email_address": {
-                "type": "email",
-                "source": "Email Id",
-                "default": "thebrandscanner@gmail.com",
-            },
-            "instagram_profile": {
-                "type": "url",
-                "source": "Instagram url",
-            },
-            "facebook_profile": {
-                "type": "url",
-                "source": "Facebook url",
-            },
-            # Labels
-            "indicative_pricing": {
-                "type": "enum",
-                "source": "indicative_pricing_cleaned",
-                "choices": {
-                    "100": Brand.IndicativePricing.BUDGET_FRIENDLY,
-                    "1000": Brand.IndicativePricing.VALUE,
-                    "10000": Brand.IndicativePricing.LUXURY,
-                },
-            },
-            "made_in_india": {
-                "type": "enum",
-                "source": "Made in India",
-                "choices": {"Yes": True, "No": False},
-                "default": True,
-            },
-            "environment_friendly": {
-                "type": "multiple_choice",
-                "source": "Adhoc Questions",
-                "contains": {
-                    "Sustainable": True,
-                },
-            },
-            "handcrafted": {
-                "type": "multiple_choice",
-                "source": "Adhoc Questions",
-                "contains": {
-                    "Handcrafted": True,
-                },
-            },
-            "customizable": {
-                "type": "multiple_choice",
-                "source": "Adhoc Questions",
-                "contains": {
-                    "Customizable": True,
-                },
-            },
-            "material": {
-                "type": "text",
-                "source": "Material Text",
-                "default": "",
-            },
-        },
-    },
-    "BrandOnlineStore": {
-        "pre": {
-            "foreign": {
-                "accept": ["Brand"],
-                "filter_multiple": {
-                    "OnlineStore": [
-                        {"source": {"name": "Available on online stores"}},
-                    ]
-                },
-            }
-        },
-        "fields": {
-            "brand": {
-                "type": "FK",
-                "model": "Brand",
-            },
-            "online_store": {
-                "type": "FK",
-                "model": "OnlineStore",
-            },
-        },
-    },
-    "Person": {
-        "pre": {
-            "must": ["name"],
-            "image_download": ["photo"],
-        },
-        "fields": {
-            "salutation": {
-                "type": "enum",
-                "source": "Salutation",
-                "choices": {
-                    "Mr.": Person.Salutation.MR,
-                    "Ms.": Person.Salutation.MS,
-                    "Mrs.": Person.Salutation.MRS,
-                    "DR.": Person.Salutation.DR,
-                    "Pt.": Person.Salutation.PT,
-                },
-            },
-            "name": {
-                "type": "text",
-                "source": "Name of Founder",
-            },
-            "photo": {
-                "type": "image",
-                "source": "Photo of Founder (url)",
-            },
-            "background": {
-                "type": "text",
-                "source": "Background of Founder",
-                "default": "",
-            },
-        },
-    },
-    "BrandKeyPerson": {
-        "pre": {
-            "foreign": {
-                "accept": ["Brand", "Person"],
-            }
-        },
-        "fields": {
-            "brand": {"type": "FK", "model": "Brand"},
-            "person": {"type": "FK", "model": "Person"},
-            "designation": {"type": "OVERRIDE", "value": "FR"},
-        },
-    },
-    "BrandAsset": {
-        "pre": {
-            "must": ["asset"],
-            "foreign": {"accept": ["Brand"]},
-            "image_download": ["asset"],
-        },
-        "fields": {
-            "brand": {
-                "type": "FK",
-                "model": "Brand",
-            },
-            "asset": {
-                "type": "image",
-            },
-            "title": {
-                "type": "text",
-            },
-        },
-    },
-    "BrandVisual": {
-        "pre": {
-            "foreign": {
-                "accept": ["Brand"],
-                "create": {
-                    "logo": {
-                        "model": "BrandAsset",
-                        "supply": {
-                            "asset": {"source": "Logo"},
-                            "title": {"static": "Logo"},
-                        },
-                    },
-                    "cover": {
-                        "model": "BrandAsset",
-                        "supply": {
-                            "asset": {"source": "Brand Image"},
-                            "title": {"static": "Cover Image"},
-                        },
-                    },
-                },
-            }
-        },
-        "fields": {
-            "brand": {
-                "type": "FK",
-                "model": "Brand",
-            },
-            "logo": {"type": "FK", "model": "BrandAsset__logo"},
-            "cover": {"type": "FK", "model": "BrandAsset__cover"},
-        },
-    },
-    "BrandCategory": {
-        "pre": {"foreign": {"accept": ["Brand", "Category"]}},
-        "fields": {
-            "brand": {
-                "type": "FK",
-                "model": "Brand",
-            },
-            "category": {"type": "FK", "model": "Category"},
-        },
-    },
-    "BrandTag": {
-        "pre": {
-            "foreign": {
-                "accept": ["Brand", "Category"],
-                "filter_multiple": {
-                    "Tag": [
-                        {
-                            "static": {"name": "identity"},
-                            "source": {"value": "Identity"},
-                            "foreign": {"category": "Category"},
-                        },
-                        {
-                            "static": {"name": "type"},
-                            "source": {"value": "Type"},
-                            "foreign": {"category": "Category"},
-                        },
-                        {
-                            "static": {"name": "material"},
-                            "source": {"value": "Material"},
-                            "foreign": {"category": "Category"},
-                        },
-                        {
-                            "static": {"name": "design"},
-                            "source": {"value": "Design"},
-                            "foreign": {"category": "Category"},
-                        },
-                        {
-                            "static": {"name": "occasion"},
-                            "source": {"value": "Occasion"},
-                            "foreign": {"category": "Category"},
-                        },
-                    ]
-                },
-            },
-            "replace": {
-                "Identity": {
-                    "He/ Him": "Men",
-                    "She/ Her": "Women",
-                },
-                "Type": {
-                    "Heals": "Heels",
-                    "Full Body Dress": "Full body wear",
-                    "Fabric": "Fabrics",
-                },
-            },
-        },
-        "fields": {
-            "brand": {"type": "FK", "model": "Brand"},
-            "tag": {"type": "FK", "model": "Tag"},
-        },
-    },
-}
-
-CATEGORY__RULES = {
-    "clothing": SHARED_RULES,
-    "footwear": SHARED_RULES,
-}
+from utilities.sheets import open_sheet, sheet_row_count
+from utilities.telemetry import IMPORT_TELEMETRY
+from utilities.validators import is_existing_file, is_none_or_empty_string
+
+logger = logging.getLogger(__name__)
+
+
+def parse_partition(partition):
+    if partition is None:
+        return None
+
+    try:
+        partition_idx, partitions = (int(n) for n in partition.split("/"))
+    except ValueError:
+        raise CommandError(f"Partition must look like K/N, got {partition}")
+
+    if not 0 <= partition_idx < partitions:
+        raise CommandError(f"Partition {partition} is out of range.")
+    return partition_idx, partitions
+
+
+def log_rows():
+    # Per row messages are only shown with --verbosity 2 or more
+    handler = logging.StreamHandler(sys.stdout)
+    for logger_name in [__name__, "utilities.imports"]:
+        row_logger = logging.getLogger(logger_name)
+        if not row_logger.handlers:
+            row_logger.addHandler(handler)
+            row_logger.setLevel(logging.DEBUG)
+
+
+def stats_lines(stats) -> [str]:
+    return [f"{key}: {count}" for key, count in sorted(stats.items())]
+
+
+def has_changes(stats) -> bool:
+    return any(
+        count and key.endswith((" created", " updated"))
+        for key, count in stats.items()
+    )
 
 
 class Command(BaseCommand):
@@ -362,165 +110,500 @@ class Command(BaseCommand):
         parser.add_argument("--csv", type=str)
         parser.add_argument("--start", type=int, default=0)
         parser.add_argument("--count", type=int, default=0)
-        parser.add_argument("--pause", type=int, default=0)
+        parser.add_argument(
+            "--rate",
+            type=float,
+            default=0,
+            help="Image downloads per second per host. 0 means no limit.",
+        )
+        parser.add_argument(
+            "--pause",
+            type=int,
+            default=0,
+            help="Deprecated. Same as --rate 1/PAUSE.",
+        )
+        parser.add_argument(
+            "--refresh-images",
+            action="store_true",
+            help="Revalidate downloaded images with conditional requests.",
+        )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Continue after the last row committed for this CSV.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report what would be created, skipped or updated.",
+        )
+        parser.add_argument(
+            "--update",
+            action="store_true",
+            help="Update changed fields of existing brands.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100,
+            help="Number of rows committed per transaction.",
+        )
+        parser.add_argument(
+            "--ignore-invalid",
+            action="store_true",
+            help="Import even if invalid values are found. Rows that fail "
+            "validation are rolled back one by one.",
+        )
+        parser.add_argument(
+            "--skip-validation",
+            action="store_true",
+            help="Do not pre-validate the CSV columns.",
+        )
+        parser.add_argument(
+            "--partition",
+            type=str,
+            help="K/N. Only import rows whose brand falls in partition K of "
+            "N. Used by import_catalog workers.",
+        )
+        parser.add_argument(
+            "--trace-memory",
+            action="store_true",
+            help="Report peak Python memory use. Slows the import down.",
+        )
 
     def handle(self, *args, **options):
         category_name = options["category"]
         csv_file_path = options["csv"]
         start_idx = options["start"]
         num_records = options["count"]
-        pause_secs = options["pause"]
+        download_rate = options["rate"]
+        if options["pause"] > 0 and download_rate == 0:
+            download_rate = 1 / options["pause"]
+        resume = options["resume"]
+        dry_run = options["dry_run"]
+        self.update = options["update"]
+        self.batch_size = max(options["batch_size"], 1)
+        # Brand name -> (brand, changed fields) waiting for a batch UPDATE
+        self.pending_updates = {}
+        self.failed_rows = []
+        # Brands of rows that created or updated something, whose pages are
+        # rendered again after the import
+        self.brand_ids = set()
+        self.stats = collections.Counter()
+        self.row_stats = collections.Counter()
+        partition = options["partition"]
+        self.partition = parse_partition(partition)
+        if options["verbosity"] > 1:
+            log_rows()
+
+        if not is_existing_file(csv_file_path):
+            sys.exit(1)
 
-        if not is_csv(csv_file_path):
-            print(f"{csv_file_path} is not a CSV file.")
+        fingerprint = file_fingerprint(csv_file_path)
+        last_row = None
+        if resume:
+            last_row = last_committed_row(
+                category_name, fingerprint, partition
+            )
+            if last_row is None:
+                print(f"No checkpoint found. Starting at idx {start_idx}.")
+            else:
+                start_idx = last_row + 1
+                print(f"Resuming after committed row idx {last_row}.")
+
+        if start_idx < 0:
+            print("Incorrect start index. Must not be negative.")
+            sys.exit(1)
 
         category = Category.objects.get(internal_name=category_name)
         print(f"Category is {category}")
 
-        csv_rows = csv_to_dict_list(csv_file_path)
-        if start_idx >= 0 and start_idx < len(csv_rows):
-            csv_rows = csv_rows[start_idx:]
-        else:
-            print(
-                f"Incorrect start index. Must be between 0 and {len(csv_rows)}"
+        DOWNLOAD_RATE_LIMITER.configure(rate=download_rate)
+        IMAGE_MANIFEST.configure(refresh=options["refresh_images"])
+
+        run_id = new_run_id()
+
+        with contextlib.ExitStack() as stack:
+            try:
+                header, sheet_rows = stack.enter_context(
+                    open_sheet(csv_file_path)
+                )
+            except ColumnarError as e:
+                raise CommandError(str(e))
+
+            try:
+                import_plan = compile_import_plan(
+                    CATEGORY__RULES[category.internal_name], header
+                )
+            except ImportRuleError as e:
+                print(f"Import rules do not match the CSV:\n{e}")
+                sys.exit(1)
+
+            # Columnar sheets only decode the columns the rules read
+            columns = plan_source_columns(import_plan, header)
+
+            validation_report = None
+            if not options["skip_validation"]:
+                validation_report = validate_columns(
+                    import_plan,
+                    sheet_rows(start_idx, num_records, columns),
+                    start_idx,
+                )
+            if validation_report:
+                print("Invalid values found:")
+                print("\n".join(validation_report_lines(validation_report)))
+                if not (options["ignore_invalid"] or dry_run):
+                    sys.exit(1)
+
+            if dry_run:
+                indexed_rows = (
+                    (idx, csv_row)
+                    for idx, csv_row in enumerate(
+                        sheet_rows(start_idx, num_records, columns),
+                        start=start_idx,
+                    )
+                    if self.owns_row(import_plan, csv_row)
+                )
+                report = diff_import(import_plan, category, indexed_rows)
+                print("\n".join(report_lines(report)))
+                return
+
+            total_rows = max(sheet_row_count(csv_file_path) - start_idx, 0)
+            if num_records > 0:
+                total_rows = min(total_rows, num_records)
+            if self.partition is not None:
+                total_rows = round(total_rows / self.partition[1])
+            IMPORT_TELEMETRY.reset(
+                total_rows=total_rows,
+                trace_memory=options["trace_memory"],
+                stream=sys.stderr,
             )
-            sys.exit(1)
-        if num_records > 0:
-            csv_rows = csv_rows[:num_records]
 
-        for idx, csv_row in enumerate(csv_rows):
-            print(f"\n==== Reading row entry at idx {start_idx + idx} ====")
-            time.sleep(pause_secs)
+            csv_rows = sheet_rows(start_idx, num_records, columns)
+            with open_journal() as journal:
+                checkpoint = functools.partial(
+                    record_checkpoint,
+                    journal,
+                    run_id,
+                    category_name,
+                    fingerprint,
+                    partition=partition,
+                )
+                idx = self.import_rows(
+                    import_plan, category, csv_rows, start_idx, checkpoint
+                )
+
+        IMPORT_TELEMETRY.finish_progress()
+        print(json.dumps(IMPORT_TELEMETRY.summary(self.stats), indent=2))
 
-            # Import Brand
-            print(">> Brand <<")
-            brand = import_as_brand(
-                CATEGORY__RULES[category.internal_name], csv_row
+        if self.failed_rows:
+            print(
+                f"Failed {len(self.failed_rows)} rows at idx "
+                f"{', '.join(str(idx) for idx in self.failed_rows)}."
             )
-            if brand is None:
-                print("Ignored Brand. Skipping other model imports as well.")
-                continue
 
-            if Brand.objects.filter(name=brand.name).exists():
-                brand = Brand.objects.get(name=brand.name)
-                print(f"Using existing brand {brand}")
-            else:
-                brand.full_clean()
-                brand.save()
-                print(f"Created entry {brand}")
-
-            # Import BrandOnlineStore
-            print(">> BrandOnlineStore <<")
-            brand_online_stores = import_as_brandonlinestore(
-                CATEGORY__RULES[category.internal_name],
-                csv_row,
-                foreign={"Brand": brand},
+        if idx is None and last_row is not None:
+            print("All rows were already imported.")
+        elif idx is None:
+            print(f"Incorrect start index. No rows found from {start_idx}.")
+            sys.exit(1)
+
+        # import_catalog renders the pages once all partitions are done
+        if self.partition is None and self.brand_ids:
+            call_command(
+                "prerender_pages",
+                category=[category_name],
+                brand=sorted(self.brand_ids),
             )
-            for brand_online_store in brand_online_stores:
-                if not BrandOnlineStore.objects.filter(
-                    brand=brand_online_store.brand,
-                    online_store=brand_online_store.online_store,
-                ).exists():
-                    brand_online_store.full_clean()
-                    brand_online_store.save()
-                    print(f"Created entry {brand_online_store}.")
-                else:
-                    print(f"{brand_online_store} already exists. Skipping.")
-
-            # Import Person
-            print(">> Person <<")
-            person = import_as_person(
-                CATEGORY__RULES[category.internal_name], csv_row
+
+    def import_rows(
+        self, import_plan, category, csv_rows, start_idx, checkpoint
+    ):
+        idx = None
+        row_plan = without_image_downloads(import_plan)
+        rows = enumerate(
+            IMPORT_TELEMETRY.timed_iter("parse", csv_rows), start=start_idx
+        )
+        while True:
+            batch = list(itertools.islice(rows, self.batch_size))
+            if not batch:
+                break
+            idx = batch[-1][0]
+
+            # Images are fetched before the transaction, so that it holds no
+            # locks across network I/O and rate limit waits
+            downloaded = []
+            for row_idx, csv_row in batch:
+                if not self.owns_row(import_plan, csv_row):
+                    continue
+                try:
+                    download_row_images(import_plan, csv_row)
+                except requests.RequestException as e:
+                    self.failed_rows.append(row_idx)
+                    print(f"Skipped row entry at idx {row_idx}: {e!r}")
+                    IMPORT_TELEMETRY.row_done()
+                    continue
+                downloaded.append((row_idx, csv_row))
+
+            # Rows of a batch commit together, each inside its own savepoint
+            with transaction.atomic():
+                for row_idx, csv_row in downloaded:
+                    logger.debug(
+                        "\n==== Reading row entry at idx %s ====", row_idx
+                    )
+
+                    with IMPORT_TELEMETRY.stage("row"):
+                        self.import_row_in_savepoint(
+                            row_plan, category, row_idx, csv_row
+                        )
+                    IMPORT_TELEMETRY.row_done()
+
+                self.flush_updates()
+                transaction.on_commit(functools.partial(checkpoint, idx))
+
+        return idx
+
+    def import_row_in_savepoint(self, import_plan, category, idx, csv_row):
+        pending_updates = dict(self.pending_updates)
+        self.row_stats = collections.Counter()
+        self.row_brand_id = None
+        try:
+            with transaction.atomic():
+                self.import_row(import_plan, category, csv_row)
+        except ROW_ERRORS as e:
+            # Only this row's writes and queued updates are discarded
+            self.pending_updates = pending_updates
+            self.failed_rows.append(idx)
+            print(f"Rolled back row entry at idx {idx}: {e!r}")
+        else:
+            self.stats.update(self.row_stats)
+            if has_changes(self.row_stats):
+                self.brand_ids.add(self.row_brand_id)
+
+    def owns_row(self, import_plan, csv_row):
+        if self.partition is None:
+            return True
+
+        partition_idx, partitions = self.partition
+        brand_name = csv_row.get(import_plan["Brand"]["columns"]["name"])
+        # Rows without a brand name are ignored by every partition but one
+        if is_none_or_empty_string(brand_name):
+            return partition_idx == 0
+        return brand_partition(brand_name, partitions) == partition_idx
+
+    def count(self, model_name, outcome):
+        self.row_stats[f"{model_name} {outcome}"] += 1
+
+    def import_row(self, import_plan, category, csv_row):
+        # Import Brand
+        logger.debug(">> Brand <<")
+        brand = import_as_brand(import_plan, csv_row)
+        if brand is None:
+            self.count("Brand", "ignored")
+            logger.debug(
+                "Ignored Brand. Skipping other model imports as well."
             )
-            import_brandkeyperson = False
-            if person is None:
-                print("Ignored Person.")
-            elif Person.objects.filter(name=person.name).exists():
-                person = Person.objects.get(name=person.name)
-                print(f"Using existing person {person}.")
-                import_brandkeyperson = True
+            return
+
+        existing_brand = self.existing_brand(brand.name)
+        if existing_brand is not None and self.update:
+            brand = self.update_brand(import_plan, existing_brand, brand)
+        elif existing_brand is not None:
+            brand = existing_brand
+            self.count("Brand", "skipped")
+            logger.debug("Using existing brand %s", brand)
+        else:
+            self.create(brand)
+            self.count("Brand", "created")
+            logger.debug("Created entry %s", brand)
+        self.row_brand_id = brand.id
+
+        # Import BrandOnlineStore
+        logger.debug(">> BrandOnlineStore <<")
+        brand_online_stores = import_as_brandonlinestore(
+            import_plan, csv_row, foreign={"Brand": brand}
+        )
+        for brand_online_store in brand_online_stores:
+            if not BrandOnlineStore.objects.filter(
+                brand=brand_online_store.brand,
+                online_store=brand_online_store.online_store,
+            ).exists():
+                self.create(brand_online_store)
+                self.count("BrandOnlineStore", "created")
+                logger.debug("Created entry %s.", brand_online_store)
             else:
-                person.full_clean()
-                person.save()
-                import_brandkeyperson = True
-                print(f"Created entry {person}")
-
-            # Import BrandKeyPerson with FK to Brand and Person
-            if import_brandkeyperson:
-                print(">> BrandKeyPerson <<")
-                brand_key_person = import_as_brandkeyperson(
-                    CATEGORY__RULES[category.internal_name],
-                    csv_row,
-                    foreign={"Brand": brand, "Person": person},
+                self.count("BrandOnlineStore", "skipped")
+                logger.debug(
+                    "%s already exists. Skipping.", brand_online_store
                 )
-                if not BrandKeyPerson.objects.filter(
-                    brand=brand_key_person.brand,
-                    person=brand_key_person.person,
-                ).exists():
-                    brand_key_person.full_clean()
-                    brand_key_person.save()
-                    print(f"Created entry {brand_key_person}")
-                else:
-                    print(f"{brand_key_person} already exists. Skipping.")
-
-            # Import BrandVisual and corresponding BrandAsset
-            print(">> BrandVisual <<")
-            brand_visual = import_as_brandvisual(
-                CATEGORY__RULES[category.internal_name],
+
+        # Import Person
+        logger.debug(">> Person <<")
+        person = import_as_person(import_plan, csv_row)
+        import_brandkeyperson = False
+        if person is None:
+            logger.debug("Ignored Person.")
+        elif Person.objects.filter(name=person.name).exists():
+            existing_person = Person.objects.get(name=person.name)
+            # import_catalog creates people before their photos are
+            # downloaded
+            if not existing_person.photo and person.photo:
+                existing_person.photo = person.photo
+                existing_person.save(update_fields=["photo"])
+                logger.debug("Added photo of person %s.", existing_person)
+            person = existing_person
+            self.count("Person", "skipped")
+            logger.debug("Using existing person %s.", person)
+            import_brandkeyperson = True
+        else:
+            self.create(person)
+            self.count("Person", "created")
+            import_brandkeyperson = True
+            logger.debug("Created entry %s", person)
+
+        # Import BrandKeyPerson with FK to Brand and Person
+        if import_brandkeyperson:
+            logger.debug(">> BrandKeyPerson <<")
+            brand_key_person = import_as_brandkeyperson(
+                import_plan,
                 csv_row,
-                foreign={"Brand": brand},
+                foreign={"Brand": brand, "Person": person},
             )
-            if not BrandVisual.objects.filter(
-                brand=brand_visual.brand
+            if not BrandKeyPerson.objects.filter(
+                brand=brand_key_person.brand,
+                person=brand_key_person.person,
             ).exists():
-                brand_visual.full_clean()
-                brand_visual.save()
-                print(f"Created entry {brand_visual}")
+                self.create(brand_key_person)
+                self.count("BrandKeyPerson", "created")
+                logger.debug("Created entry %s", brand_key_person)
             else:
-                print(f"{brand_visual} already exists. Skipping.")
+                self.count("BrandKeyPerson", "skipped")
+                logger.debug("%s already exists. Skipping.", brand_key_person)
 
-            # Import remaining BrandAsset
-            print(">> Other BrandAsset <<")
-            brand_assets = import_remaining_brandassets(
-                CATEGORY__RULES[category.internal_name],
-                csv_row,
-                foreign={"Brand": brand},
-            )
-            for brand_asset in brand_assets:
-                if not CHECK_IF_EXISTING["BrandAsset"](brand_asset):
-                    brand_asset.full_clean()
-                    brand_asset.save()
-                    print(f"Created entry {brand_asset}")
-
-            # Import BrandCategory
-            print(">> BrandCategory <<")
-            brand_category = import_as_brandcategory(
-                CATEGORY__RULES[category.internal_name],
-                csv_row,
-                foreign={"Brand": brand, "Category": category},
-            )
-            if not BrandCategory.objects.filter(
-                brand=brand, category=category
+        # Import BrandVisual and corresponding BrandAsset
+        logger.debug(">> BrandVisual <<")
+        brand_visual = import_as_brandvisual(
+            import_plan, csv_row, foreign={"Brand": brand}
+        )
+        if not BrandVisual.objects.filter(brand=brand_visual.brand).exists():
+            self.create(brand_visual)
+            self.count("BrandVisual", "created")
+            logger.debug("Created entry %s", brand_visual)
+        else:
+            self.count("BrandVisual", "skipped")
+            logger.debug("%s already exists. Skipping.", brand_visual)
+
+        # Import remaining BrandAsset
+        logger.debug(">> Other BrandAsset <<")
+        brand_assets = import_remaining_brandassets(
+            import_plan, csv_row, foreign={"Brand": brand}
+        )
+        for brand_asset in brand_assets:
+            if not CHECK_IF_EXISTING["BrandAsset"](brand_asset):
+                self.create(brand_asset)
+                self.count("BrandAsset", "created")
+                logger.debug("Created entry %s", brand_asset)
+            else:
+                self.count("BrandAsset", "skipped")
+
+        # Import BrandCategory
+        logger.debug(">> BrandCategory <<")
+        brand_category = import_as_brandcategory(
+            import_plan,
+            csv_row,
+            foreign={"Brand": brand, "Category": category},
+        )
+        if not BrandCategory.objects.filter(
+            brand=brand, category=category
+        ).exists():
+            self.create(brand_category)
+            self.count("BrandCategory", "created")
+            logger.debug("Created entry %s", brand_category)
+        else:
+            self.count("BrandCategory", "skipped")
+            logger.debug("%s already exists. Skipping.", brand_category)
+
+        # Import BrandTag
+        logger.debug(">> BrandTag <<")
+        brand_tags = import_as_brandtag(
+            import_plan,
+            csv_row,
+            foreign={"Brand": brand, "Category": category},
+        )
+        # One query checks the category of every tag of the row
+        BrandTag.prefetch_brand_categories(brand_tags)
+        for brand_tag in brand_tags:
+            if not BrandTag.objects.filter(
+                brand=brand_tag.brand, tag=brand_tag.tag
             ).exists():
-                brand_category.full_clean()
-                brand_category.save()
-                print(f"Created entry {brand_category}")
+                self.create(brand_tag)
+                self.count("BrandTag", "created")
+                logger.debug("Created entry %s", brand_tag)
             else:
-                print(f"{brand_category} already exists. Skipping.")
+                self.count("BrandTag", "skipped")
+                logger.debug("%s already exists. Skipping.", brand_tag)
 
-            # Import BrandTag
-            print(">> BrandTag <<")
-            brand_tags = import_as_brandtag(
-                CATEGORY__RULES[category.internal_name],
-                csv_row,
-                foreign={"Brand": brand, "Category": category},
+    def create(self, model_obj):
+        with IMPORT_TELEMETRY.stage("clean"):
+            model_obj.full_clean()
+        with IMPORT_TELEMETRY.stage("write"):
+            model_obj.save()
+
+    def existing_brand(self, brand_name):
+        if brand_name in self.pending_updates:
+            return self.pending_updates[brand_name][0]
+        return Brand.objects.filter(name=brand_name).first()
+
+    def update_brand(self, import_plan, existing_brand, brand):
+        changed = changed_fields(
+            existing_brand, brand, updatable_fields(import_plan["Brand"])
+        )
+        if not changed:
+            self.count("Brand", "skipped")
+            logger.debug("Using unchanged existing brand %s", existing_brand)
+            return existing_brand
+
+        # Queued brands are copied so a rolled back row leaves them intact
+        existing_brand = copy.copy(existing_brand)
+
+        for field_name in changed:
+            field = Brand._meta.get_field(field_name)
+            setattr(
+                existing_brand,
+                field_name,
+                field.to_python(getattr(brand, field_name)),
             )
-            for brand_tag in brand_tags:
-                if not BrandTag.objects.filter(
-                    brand=brand_tag.brand, tag=brand_tag.tag
-                ).exists():
-                    brand_tag.full_clean()
-                    brand_tag.save()
-                    print(f"Created entry {brand_tag}")
-                else:
-                    print(f"{brand_tag} already exists. Skipping.")
+        existing_brand.last_updated = current_india_time()
+        with IMPORT_TELEMETRY.stage("clean"):
+            existing_brand.full_clean()
+
+        _, pending_changed = self.pending_updates.get(
+            existing_brand.name, (existing_brand, set())
+        )
+        self.pending_updates[existing_brand.name] = (
+            existing_brand,
+            pending_changed | set(changed),
+        )
+        self.count("Brand", "updated")
+        logger.debug(
+            "Updating %s of brand %s", ", ".join(changed), existing_brand
+        )
+        return existing_brand
+
+    def flush_updates(self):
+        # One UPDATE per distinct set of changed columns
+        fields__brands = {}
+        for brand, changed in self.pending_updates.values():
+            fields__brands.setdefault(tuple(sorted(changed)), []).append(brand)
+
+        for changed, brands in fields__brands.items():
+            with IMPORT_TELEMETRY.stage("write"):
+                Brand.objects.bulk_update(brands, [*changed, "last_updated"])
+            logger.debug(
+                "Updated %s brands (%s)", len(brands), ", ".join(changed)
+            )
+        if fields__brands:
+            # bulk_update sends no post_save signals
+            transaction.on_commit(bump_cache_generation)
+
+        self.pending_updates = {}
@@ -1,6 +1,16 @@
-from django.core.management.base import BaseCommand
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 
-from brand.models import Category, OnlineStore, Tag
+from brand.models import (
+    BrandCategory,
+    BrandOnlineStore,
+    BrandTag,
+    Category,
+    OnlineStore,
+    Tag,
+)
+from utilities.cache import bump_cache_generation
 
 valid_tag_names = [
     "type",
@@ -251,44 +261,226 @@ online_stores = [
 ]
 
 
-def populate_category_tags(category, tags):
-    for tag_name in tags:
-        if tag_name not in valid_tag_names:
-            print(f"Invalid tag name {tag_name}.")
-            continue
+def check_tag_names():
+    errors = []
+    for category_internal_name, category_rules in category__tags.items():
+        for tag_name in category_rules["tags"]:
+            if tag_name not in valid_tag_names:
+                errors.append(
+                    f"Invalid tag name {tag_name} in {category_internal_name}."
+                )
 
-        for tag_value in tags[tag_name]:
-            (tag, created) = Tag.objects.get_or_create(
-                category=category, name=tag_name, value=tag_value
+    if errors:
+        raise CommandError("\n".join(errors))
+
+
+def diff_categories(existing):
+    created, updated = [], []
+    for internal_name, category_rules in category__tags.items():
+        category = existing.get(internal_name)
+        display_name = category_rules["display_name"]
+        if category is None:
+            created.append(
+                Category(
+                    internal_name=internal_name, display_name=display_name
+                )
             )
-            if created:
-                print(f"Added tag {tag}")
+        elif category.display_name != display_name:
+            category.display_name = display_name
+            updated.append(category)
+
+    removed = [
+        category
+        for internal_name, category in existing.items()
+        if internal_name not in category__tags
+    ]
+    return created, updated, removed
+
+
+def diff_tags(categories, existing):
+    created, updated = [], []
+    wanted = set()
+    for internal_name, category_rules in category__tags.items():
+        category = categories[internal_name]
+        for tag_name, tag_values in category_rules["tags"].items():
+            # Tags are shown in the order they are listed
+            for sequence, tag_value in enumerate(tag_values, start=1):
+                key = (category.id, tag_name.lower(), tag_value.lower())
+                wanted.add(key)
+                tag = existing.get(key)
+                if tag is None:
+                    created.append(
+                        Tag(
+                            category=category,
+                            name=tag_name,
+                            value=tag_value,
+                            sequence=sequence,
+                        )
+                    )
+                elif tag.sequence != sequence:
+                    tag.sequence = sequence
+                    updated.append(tag)
+
+    removed = [tag for key, tag in existing.items() if key not in wanted]
+    return created, updated, removed
 
 
-def populate_online_stores(stores):
-    for store_name in stores:
-        (store, created) = OnlineStore.objects.get_or_create(name=store_name)
+def diff_online_stores(existing):
+    created, updated = [], []
+    for store_name in online_stores:
+        store = existing.get(store_name.lower())
+        if store is None:
+            created.append(OnlineStore(name=store_name))
+        elif store.name != store_name:
+            store.name = store_name
+            updated.append(store)
 
-        if created:
-            print(f"Added online store {store_name}")
+    wanted = {store_name.lower() for store_name in online_stores}
+    removed = [store for name, store in existing.items() if name not in wanted]
+    return created, updated, removed
+
+
+def split_protected(removed, referencing_model, field_name):
+    # PROTECT keeps referenced rows, those are only reported
+    protected_ids = set(
+        referencing_model.objects.filter(
+            **{f"{field_name}__in": removed}
+        ).values_list(field_name, flat=True)
+    )
+    prunable = [obj for obj in removed if obj.id not in protected_ids]
+    protected = [obj for obj in removed if obj.id in protected_ids]
+    return prunable, protected
+
+
+def report(action, objs, note=""):
+    for obj in objs:
+        print(f"{action} {obj._meta.verbose_name} {obj}{note}")
 
 
 class Command(BaseCommand):
     help = "Populates fields for internal models."
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--prune",
+            action="store_true",
+            help="Delete categories, tags and online stores that are no "
+            "longer listed and not used by any brand.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report the changes.",
+        )
+
     def handle(self, *args, **options):
-        for category_internal_name in category__tags:
-            (category, created) = Category.objects.get_or_create(
-                internal_name=category_internal_name,
-                display_name=category__tags[category_internal_name][
-                    "display_name"
-                ],
-            )
-            if created:
-                print(f"Added category {category}")
+        prune = options["prune"]
+        dry_run = options["dry_run"]
+
+        check_tag_names()
+
+        # Current state in three queries
+        categories = {
+            category.internal_name.lower(): category
+            for category in Category.objects.all()
+        }
+        tags = {
+            (tag.category_id, tag.name.lower(), tag.value.lower()): tag
+            for tag in Tag.objects.all()
+        }
+        stores = {
+            store.name.lower(): store for store in OnlineStore.objects.all()
+        }
+
+        with transaction.atomic():
+            created, updated, removed_categories = diff_categories(categories)
+            report("Added", created)
+            report("Updated", updated)
+            if not dry_run:
+                Category.objects.bulk_create(created)
+                Category.objects.bulk_update(updated, ["display_name"])
+
+            if created and not dry_run:
+                # Not every database returns ids from bulk_create
+                categories.update(
+                    (category.internal_name, category)
+                    for category in Category.objects.filter(
+                        internal_name__in=[c.internal_name for c in created]
+                    )
+                )
+            elif created:
+                categories.update(
+                    (category.internal_name, category) for category in created
+                )
+
+            created, updated, removed_tags = diff_tags(categories, tags)
+            report("Added", created)
+            report("Updated", updated)
+            if not dry_run:
+                Tag.objects.bulk_create(created)
+                Tag.objects.bulk_update(updated, ["sequence"])
 
-            populate_category_tags(
-                category, category__tags[category.internal_name]["tags"]
+            created, updated, removed_stores = diff_online_stores(stores)
+            report("Added", created)
+            report("Updated", updated)
+            if not dry_run:
+                OnlineStore.objects.bulk_create(created)
+                OnlineStore.objects.bulk_update(updated, ["name"])
+
+            self.prune(
+                removed_categories,
+                removed_tags,
+                removed_stores,
+                prune and not dry_run,
             )
+            if not dry_run:
+                # Bulk writes send no post_save signals
+                transaction.on_commit(bump_cache_generation)
+
+        # Filter options of every listing page may have changed
+        if not dry_run:
+            call_command("prerender_pages")
+
+    def prune(self, categories, tags, stores, delete):
+        tags, protected_tags = split_protected(tags, BrandTag, "tag")
+        report("Kept", protected_tags, " (unlisted, used by brands)")
+
+        # A category can only go once all of its tags are gone
+        categories, protected_categories = split_protected(
+            categories, BrandCategory, "category"
+        )
+        kept_tag_category_ids = {tag.category_id for tag in protected_tags}
+        kept_tag_category_ids.update(
+            Tag.objects.filter(category__in=categories)
+            .exclude(id__in=[tag.id for tag in tags])
+            .values_list("category", flat=True)
+        )
+        protected_categories.extend(
+            category
+            for category in categories
+            if category.id in kept_tag_category_ids
+        )
+        categories = [
+            category
+            for category in categories
+            if category.id not in kept_tag_category_ids
+        ]
+        report(
+            "Kept", protected_categories, " (unlisted, used by brands or tags)"
+        )
+
+        stores, protected_stores = split_protected(
+            stores, BrandOnlineStore, "online_store"
+        )
+        report("Kept", protected_stores, " (unlisted, used by brands)")
 
-        populate_online_stores(online_stores)
+        for model, objs in [
+            (Tag, tags),
+            (Category, categories),
+            (OnlineStore, stores),
+        ]:
+            if not delete:
+                report("Unlisted", objs, " (--prune removes it)")
+            elif objs:
+                report("Removed", objs)
+                model.objects.filter(id__in=[obj.id for obj in objs]).delete()
@@ -0,0 +1,57 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from utilities.prerender import (
+    affected_pages,
+    load_stamps,
+    prerender,
+    save_stamps,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Renders listing and detail pages into static HTML files under "
+        "WEB_ROOT, rewriting only pages whose HTML changed"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--category",
+            action="append",
+            default=[],
+            help="Only render pages of this category. Repeatable.",
+        )
+        parser.add_argument(
+            "--brand",
+            action="append",
+            type=int,
+            default=[],
+            help="Only render pages showing this brand id. Repeatable.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count(),
+            help="Number of render threads.",
+        )
+
+    def handle(self, *args, **options):
+        # A full run also removes pages of deleted brands and categories
+        full_run = not (options["category"] or options["brand"])
+        pages = affected_pages(options["category"], options["brand"])
+        print(f"Rendering {len(pages)} pages")
+
+        stamps, outcomes = prerender(
+            pages,
+            max(options["workers"], 1),
+            load_stamps(),
+            prune=full_run,
+        )
+        save_stamps(stamps)
+
+        for outcome, file_names in outcomes.items():
+            print(f"{outcome}: {len(file_names)}")
+        for file_name in outcomes["failed"]:
+            print(f"Failed to render {file_name}")
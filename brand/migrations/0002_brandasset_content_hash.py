@@ -0,0 +1,45 @@
+# Generated by Django 4.2.2 on 2026-10-19 17:47
+
+from django.db import migrations, models
+
+import utilities.storage
+
+
+def backfill_content_hash(apps, schema_editor):
+    BrandAsset = apps.get_model("brand", "BrandAsset")
+
+    for brand_asset in BrandAsset.objects.filter(content_hash="").iterator():
+        if not brand_asset.asset.storage.exists(brand_asset.asset.name):
+            continue
+        brand_asset.content_hash = utilities.storage.field_file_to_sha256(
+            brand_asset.asset
+        )
+        brand_asset.save(update_fields=["content_hash"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("brand", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="brandasset",
+            name="content_hash",
+            field=models.CharField(
+                blank=True, db_index=True, editable=False, max_length=64
+            ),
+        ),
+        migrations.AlterField(
+            model_name="brandasset",
+            name="asset",
+            field=models.FileField(
+                help_text="Select an image that you want to upload.",
+                storage=utilities.storage.ContentAddressedStorage(),
+                upload_to=utilities.storage.content_addressed_upload_to,
+            ),
+        ),
+        migrations.RunPython(
+            backfill_content_hash, reverse_code=migrations.RunPython.noop
+        ),
+    ]
@@ -5,6 +5,11 @@ from django.db.models import UniqueConstraint
 from django.db.models.functions import Lower
 
 from utilities.dates import current_india_time
+from utilities.storage import (
+    ContentAddressedStorage,
+    content_addressed_upload_to,
+    field_file_to_sha256,
+)
 
 
 class LowerCaseCharField(models.CharField):
@@ -222,9 +227,13 @@ class BrandAsset(models.Model):
     brand = models.ForeignKey(Brand, on_delete=models.CASCADE)
 
     asset = models.FileField(
-        upload_to="uploads/%Y/%m/%d/",
+        upload_to=content_addressed_upload_to,
+        storage=ContentAddressedStorage(),
         help_text="Select an image that you want to upload.",
     )
+    content_hash = models.CharField(
+        max_length=64, blank=True, editable=False, db_index=True
+    )
     title = models.CharField(
         max_length=100,
         help_text="Provide a title for this image.",
@@ -251,6 +260,12 @@ class BrandAsset(models.Model):
     def get_absolute_url(self):
         return self.asset.url
 
+    def save(self, *args, **kwargs):
+        # A replaced file is named after its own hash, not the old one
+        if self.asset and (not self.content_hash or not self.asset._committed):
+            self.content_hash = field_file_to_sha256(self.asset)
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"[{self.brand.name}] {self.title}"
 
@@ -355,14 +370,41 @@ class BrandTag(models.Model):
     brand = models.ForeignKey(Brand, on_delete=models.CASCADE)
     tag = models.ForeignKey(Tag, on_delete=models.PROTECT)
 
+    @classmethod
+    def prefetch_brand_categories(cls, brand_tags):
+        """
+        Loads the categories of all brands of brand_tags in one query, so
+        that validating each of them does not query again. Each brand tag
+        uses them for its next clean() only, so categories added later are
+        not missed.
+        """
+        brand_id__category_ids = {
+            brand_tag.brand_id: set() for brand_tag in brand_tags
+        }
+        for brand_id, category_id in BrandCategory.objects.filter(
+            brand_id__in=brand_id__category_ids
+        ).values_list("brand_id", "category_id"):
+            brand_id__category_ids[brand_id].add(category_id)
+
+        for brand_tag in brand_tags:
+            brand_tag._brand_category_ids = brand_id__category_ids[
+                brand_tag.brand_id
+            ]
+
     @property
     def brand_category_exists(self):
+        category_ids = getattr(self, "_brand_category_ids", None)
+        if category_ids is not None:
+            return self.tag.category_id in category_ids
+
         return BrandCategory.objects.filter(
-            brand=self.brand, category=self.tag.category
+            brand_id=self.brand_id, category_id=self.tag.category_id
         ).exists()
 
     def clean(self):
-        if not self.brand_category_exists:
+        brand_category_exists = self.brand_category_exists
+        self._brand_category_ids = None
+        if not brand_category_exists:
             raise ValidationError(
                 f"{self.brand} doesn't belong to category {self.tag.category}."
             )
@@ -1 +1,115 @@
-# from django.test import TestCase
+from unittest import skipUnless
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from brand.models import Brand, BrandCategory, BrandTag, Category, Tag
+
+
+@skipUnless(
+    connection.vendor == "mysql",
+    "brandscanner_db.sql is loaded by SnapshotTestRunner on MySQL only",
+)
+class ReferenceDatasetTests(TestCase):
+    def test_categories_are_loaded(self):
+        self.assertEqual(
+            Category.objects.get(internal_name="clothing").display_name,
+            "Clothing",
+        )
+
+    def test_brands_are_loaded(self):
+        self.assertEqual(Brand.objects.get(pk=1).name, "Redtape")
+
+    def test_brand_listing_renders_loaded_brands(self):
+        # A cached page is not rendered, so it has no context
+        cache.clear()
+        response = self.client.get(
+            reverse("brand:brand_listing", args=["clothing"])
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(response.context["total_brands"], 0)
+
+
+class BrandTagTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(
+            internal_name="clothing", display_name="Clothing"
+        )
+        cls.other_category = Category.objects.create(
+            internal_name="footwear", display_name="Footwear"
+        )
+        cls.tags = [
+            Tag.objects.create(category=category, name="type", value=value)
+            for category in [cls.category, cls.other_category]
+            for value in ["topwear", "bottomwear", "ethnic", "sports"]
+        ]
+        cls.brand = Brand.objects.create(
+            name="Tagged",
+            title="Tagged",
+            description="Tagged",
+            founding_year=2020,
+            location=Brand.Location.INDIA,
+        )
+        BrandCategory.objects.create(brand=cls.brand, category=cls.category)
+        cls.user = User.objects.create_superuser("admin", "", "password")
+
+    def change_page_queries(self):
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse("admin:brand_brand_change", args=[self.brand.pk])
+            )
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_admin_change_page_queries_do_not_grow_with_tags(self):
+        BrandTag.objects.create(brand=self.brand, tag=self.tags[0])
+        # The first request also fills the content type cache
+        self.change_page_queries()
+        one_tag_queries = self.change_page_queries()
+
+        for tag in self.tags[1:4]:
+            BrandTag.objects.create(brand=self.brand, tag=tag)
+        self.assertEqual(self.change_page_queries(), one_tag_queries)
+
+    def test_prefetched_categories_miss_no_later_category(self):
+        brand_tag = BrandTag(brand=self.brand, tag=self.tags[4])
+        BrandTag.prefetch_brand_categories([brand_tag])
+        with self.assertRaises(ValidationError):
+            brand_tag.clean()
+
+        BrandCategory.objects.create(
+            brand=self.brand, category=self.other_category
+        )
+        brand_tag.clean()
+
+
+class CacheGenerationTests(TestCase):
+    def test_one_bump_per_transaction(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            with transaction.atomic():
+                for internal_name in ["clothing", "footwear"]:
+                    Category.objects.create(
+                        internal_name=internal_name,
+                        display_name=internal_name.title(),
+                    )
+        self.assertEqual(len(callbacks), 1)
+
+    def test_rolled_back_bump_is_registered_again(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            with self.assertRaises(ValueError):
+                with transaction.atomic():
+                    Category.objects.create(
+                        internal_name="clothing", display_name="Clothing"
+                    )
+                    raise ValueError
+            Category.objects.create(
+                internal_name="footwear", display_name="Footwear"
+            )
+        self.assertEqual(len(callbacks), 1)
@@ -13,6 +13,11 @@ urlpatterns = [
         name="brand_listing_default",
     ),
     path("p/<int:brand_id>/", views.brand_detail, name="brand_detail"),
+    path(
+        "export/<str:selected_category>/",
+        views.export_catalog,
+        name="export_catalog",
+    ),
     path(
         "<str:selected_category>/", views.brand_listing, name="brand_listing"
     ),
@@ -1,12 +1,27 @@
 import copy
 
+from django.contrib.admin.views.decorators import staff_member_required
 from django.core.paginator import Paginator
 from django.db.models import Count, Q
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, render
 
 from brand.models import Brand, Category, Tag
+from utilities.cache import cache_page_stale_while_revalidate
+from utilities.catalog import CATEGORY_TAGS
+from utilities.db_routers import use_read_replica
+from utilities.export import EXPORT_FORMATS, export_category
+from utilities.import_rules import CATEGORY__RULES
 
 PAGE_SIZE = 20
+# Pages are recomputed after the soft TTL or a data change, and dropped
+# after the hard TTL
+PAGE_CACHE_SOFT_TTL_SECS = 5 * 60
+PAGE_CACHE_HARD_TTL_SECS = 8 * 60 * 60
+EXPORT_CONTENT_TYPES = {
+    "csv": "text/csv",
+    "jsonl": "application/x-ndjson",
+}
 BRAND_TAGS = {
     # Keys are model field names
     "location": [
@@ -27,22 +42,28 @@ def _update_display_tags(category_tags, tag_name, tag_value, update_fields):
                 option[field] = update_fields[field]
 
 
+@use_read_replica
 def home_page(request):
     return render(request, "index.html")
 
 
+@cache_page_stale_while_revalidate(
+    PAGE_CACHE_SOFT_TTL_SECS, PAGE_CACHE_HARD_TTL_SECS
+)
+@use_read_replica
 def brand_listing(request, selected_category):
     category = get_object_or_404(Category, internal_name=selected_category)
 
     tags = Tag.objects.filter(category__internal_name=category.internal_name)
-    category_tag_names = set(tags.values_list("name", flat=True))
+    cached_tags = CATEGORY_TAGS.get(category.internal_name)
+    category_tag_names = {tag_name for tag_name, _ in cached_tags}
 
     # For filter options
     category_tags = dict()
-    for tag in tags:
-        if tag.name not in category_tags:
-            category_tags[tag.name] = list()
-        category_tags[tag.name].append({"value": tag.value})
+    for tag_name, tag_value in cached_tags:
+        if tag_name not in category_tags:
+            category_tags[tag_name] = list()
+        category_tags[tag_name].append({"value": tag_value})
 
     # Filter brands based on category tags provided in request params
     query_filter = None
@@ -113,6 +134,41 @@ def brand_listing(request, selected_category):
     )
 
 
+@cache_page_stale_while_revalidate(
+    PAGE_CACHE_SOFT_TTL_SECS, PAGE_CACHE_HARD_TTL_SECS
+)
+@use_read_replica
 def brand_detail(request, brand_id):
     brand = get_object_or_404(Brand, id=brand_id)
     return render(request, "brand-detail.html", {"brand": brand})
+
+
+@staff_member_required
+def export_catalog(request, selected_category):
+    if selected_category not in CATEGORY__RULES:
+        raise Http404("No import rules for this category.")
+    category = get_object_or_404(Category, internal_name=selected_category)
+
+    export_format = request.GET.get("format", EXPORT_FORMATS[0])
+    if export_format not in EXPORT_FORMATS:
+        raise Http404("Unknown export format.")
+    compress = request.GET.get("gzip") == "1"
+
+    file_name = f"{category.internal_name}.{export_format}"
+    content_type = EXPORT_CONTENT_TYPES[export_format]
+    if compress:
+        file_name += ".gz"
+        content_type = "application/gzip"
+
+    response = StreamingHttpResponse(
+        export_category(
+            category,
+            CATEGORY__RULES[selected_category],
+            export_format=export_format,
+            compress=compress,
+            base_url=request.build_absolute_uri("/"),
+        ),
+        content_type=content_type,
+    )
+    response["Content-Disposition"] = f'attachment; filename="{file_name}"'
+    return response
@@ -33,6 +33,8 @@ TEMP_ROOT = BASE_DIR / "tmp"
 DATA_ROOT = TEMP_ROOT / "data"
 STATIC_ROOT = TEMP_ROOT / "static"
 MEDIA_ROOT = TEMP_ROOT / "media"
+# Pre-rendered pages, served by the front web server
+WEB_ROOT = TEMP_ROOT / "html"
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/4.0/howto/deployment/checklist/
@@ -64,6 +66,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "utilities.db_routers.PinPrimaryMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -107,6 +110,20 @@ DATABASES["default"]["OPTIONS"] = {
 # number of seconds to retain connections
 CONN_MAX_AGE = 600
 
+# Read replicas, as a comma separated DATABASE_REPLICA_URLS. Only views
+# marked with utilities.db_routers.use_read_replica read from them.
+DATABASE_REPLICAS = []
+for replica_idx, replica_url in enumerate(
+    env.list("DATABASE_REPLICA_URLS", default=[])
+):
+    replica_alias = f"replica_{replica_idx}"
+    DATABASES[replica_alias] = env.db_url_config(replica_url)
+    DATABASES[replica_alias]["OPTIONS"] = DATABASES["default"]["OPTIONS"]
+    # Tests read what they wrote, through the test primary
+    DATABASES[replica_alias]["TEST"] = {"MIRROR": "default"}
+    DATABASE_REPLICAS.append(replica_alias)
+DATABASE_ROUTERS = ["utilities.db_routers.ReplicaRouter"]
+
 
 # Password validation
 # https://docs.djangoproject.com/en/1.9/ref/settings/#auth-password-validators
@@ -155,6 +172,9 @@ STATICFILES_STORAGE = (
     "django.contrib.staticfiles.storage.ManifestStaticFilesStorage"
 )
 
+# Imported images are hardlinked from the import cache instead of copied
+DEFAULT_FILE_STORAGE = "utilities.storage.LinkingFileSystemStorage"
+
 # https://docs.djangoproject.com/en/dev/ref/contrib/staticfiles/#std:setting-STATICFILES_DIRS
 STATICFILES_DIRS = (BASE_DIR / "www",)
 
@@ -42,13 +42,28 @@ SERVER_EMAIL = "The Brand Scanner Server <no-reply@thebrandscanner.in>"
 
 CACHES = {
     "default": {
-        "BACKEND": "django.core.cache.backends.memcached.PyMemcacheCache",
+        # Hot keys are served from an in-process LRU for up to 2 seconds
+        # before memcached is asked again
+        "BACKEND": "utilities.cache_backends.TwoTierCache",
         "LOCATION": "127.0.0.1:11211",
         "TIMEOUT": 30000,  # Every 8 hours
+        "OPTIONS": {
+            "SHARED_BACKEND": (
+                "django.core.cache.backends.memcached.PyMemcacheCache"
+            ),
+            # Hit ratios of both tiers in the uWSGI log, every 10 minutes
+            "STATS_INTERVAL": 600,
+        },
         # can use below in case of memcache error
         # "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
         # "LOCATION": "unique-snowflake",
-    }
+    },
+    # A logout must not be undone by a session copy of another process
+    "sessions": {
+        "BACKEND": "django.core.cache.backends.memcached.PyMemcacheCache",
+        "LOCATION": "127.0.0.1:11211",
+        "TIMEOUT": 30000,
+    },
 }
 
 CACHE_MIDDLEWARE_KEY_PREFIX = "dj40"
@@ -56,3 +71,4 @@ CACHE_MIDDLEWARE_KEY_PREFIX = "dj40"
 # cached_db is write-through cache where all reads are from cache
 # while writes in both in db and cache
 SESSION_ENGINE = "django.contrib.sessions.backends.cached_db"
+SESSION_CACHE_ALIAS = "sessions"
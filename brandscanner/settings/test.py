@@ -6,6 +6,10 @@ ALLOWED_HOSTS = ["testserver"]
 
 TEMP_ROOT = os.path.join(BASE_DIR, "tmp", "tests")  # noqa
 DATA_ROOT = os.path.join(TEMP_ROOT, "data")
+WEB_ROOT = os.path.join(TEMP_ROOT, "html")
+
+# Reuses a prebuilt test database, see utilities/test_runner.py
+TEST_RUNNER = "utilities.test_runner.SnapshotTestRunner"
 
 
 # EMAIL CONFIGURATION
@@ -11,8 +11,13 @@ import os
 
 from django.core.wsgi import get_wsgi_application
 
+from utilities.warmup import warm_up
+
 os.environ.setdefault(
     "DJANGO_SETTINGS_MODULE", "brandscanner.settings.production"
 )
 
 application = get_wsgi_application()
+
+# uWSGI loads this module in the master, so workers fork warm
+warm_up()
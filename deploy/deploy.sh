@@ -14,6 +14,9 @@ python3.11 manage.py collectstatic --noinput --settings=brandscanner.settings.pr
 echo "Running migrations"
 python3.11 manage.py migrate --settings=brandscanner.settings.production
 
+echo "Rendering static pages"
+python3.11 manage.py prerender_pages --settings=brandscanner.settings.production
+
 echo "Restarting uwsgi"
 touch brandscanner/wsgi.py
 
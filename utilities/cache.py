@@ -0,0 +1,112 @@
+import functools
+import hashlib
+import time
+
+from django.core.cache import cache
+
+from utilities.db_routers import pinned_to_primary, read_from_primary
+
+CACHE_GENERATION_KEY = "cache_generation"
+RECOMPUTE_LOCK_SECS = 30
+# How long a miss waits for another client's recomputation
+RECOMPUTE_WAIT_SECS = 5
+RECOMPUTE_POLL_SECS = 0.05
+
+
+def cache_generation() -> int:
+    generation = cache.get(CACHE_GENERATION_KEY)
+    if generation is None:
+        cache.add(CACHE_GENERATION_KEY, 1, timeout=None)
+        generation = cache.get(CACHE_GENERATION_KEY, 1)
+    return generation
+
+
+def bump_cache_generation():
+    """
+    Marks every value cached with get_or_recompute as stale. They are
+    still served until recomputed, one client per key.
+    """
+    try:
+        cache.incr(CACHE_GENERATION_KEY)
+    except ValueError:
+        # Not set, or evicted
+        cache.add(CACHE_GENERATION_KEY, 1, timeout=None)
+
+
+def _recompute(key, compute, soft_ttl, hard_ttl, generation):
+    try:
+        value = compute()
+        cache.set(key, (value, time.time() + soft_ttl, generation), hard_ttl)
+        return value
+    finally:
+        cache.delete(f"{key}:lock")
+
+
+def get_or_recompute(key, compute, soft_ttl, hard_ttl):
+    """
+    Stale-while-revalidate: after soft_ttl seconds, or once the cache
+    generation changed, the value is stale. The first client to see it
+    stale takes a lock with cache.add, which is atomic in memcached, and
+    recomputes it inline. Everyone else keeps getting the stale value.
+    Only after hard_ttl is the value gone, and then the clients without
+    the lock wait for the one recomputing it.
+    """
+    generation = cache_generation()
+    entry = cache.get(key)
+    lock_key = f"{key}:lock"
+
+    if entry is not None:
+        value, soft_expires_at, entry_generation = entry
+        if time.time() < soft_expires_at and entry_generation == generation:
+            return value
+        if not cache.add(lock_key, 1, RECOMPUTE_LOCK_SECS):
+            return value
+        return _recompute(key, compute, soft_ttl, hard_ttl, generation)
+
+    if cache.add(lock_key, 1, RECOMPUTE_LOCK_SECS):
+        return _recompute(key, compute, soft_ttl, hard_ttl, generation)
+
+    deadline = time.monotonic() + RECOMPUTE_WAIT_SECS
+    while time.monotonic() < deadline:
+        time.sleep(RECOMPUTE_POLL_SECS)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry[0]
+
+    # The client holding the lock is slow or gone
+    return compute()
+
+
+def cache_page_stale_while_revalidate(soft_ttl, hard_ttl):
+    """
+    Caches the responses of a view for GET and HEAD requests by their full
+    path with get_or_recompute. Only for views whose output does not
+    depend on the user.
+
+    Responses are recomputed from the primary, as a lagging replica would
+    put old data in the cache under the new generation. Clients pinned to
+    the primary after a write skip the cache, which may not show their
+    write yet.
+    """
+
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD") or pinned_to_primary():
+                return view(request, *args, **kwargs)
+
+            path_hash = hashlib.md5(
+                request.get_full_path().encode("utf-8")
+            ).hexdigest()
+            return get_or_recompute(
+                f"page:{view.__module__}.{view.__name__}:{path_hash}",
+                functools.partial(
+                    read_from_primary, view, request, *args, **kwargs
+                ),
+                soft_ttl,
+                hard_ttl,
+            )
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,258 @@
+import collections
+import os
+import pickle
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.utils.module_loading import import_string
+
+LOCAL_MAX_ENTRIES = 1000
+LOCAL_MAX_BYTES = 32 * 2**20
+# Bigger values are only kept in the shared cache
+LOCAL_MAX_ITEM_BYTES = 256 * 2**10
+# Longest a process may serve a value another process changed
+LOCAL_TTL_SECS = 2
+
+_MISSING = object()
+# Django creates a cache backend per thread, the local tier is per process
+_local_tiers = {}
+_local_tiers_lock = threading.Lock()
+
+
+class LocalTier:
+    """
+    Bounded LRU of pickled values with an expiry each, and hit counts of
+    both tiers.
+    """
+
+    def __init__(self, max_entries, max_bytes, max_item_bytes):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_item_bytes = max_item_bytes
+        # key: (pickled value, expires at)
+        self.items = collections.OrderedDict()
+        self.bytes = 0
+        self.lock = threading.Lock()
+        self.counts = collections.Counter()
+        self.stats_at = time.monotonic()
+
+    def get(self, key):
+        with self.lock:
+            item = self.items.get(key)
+            if item is None:
+                return _MISSING
+            pickled, expires_at = item
+            if time.monotonic() >= expires_at:
+                self._delete(key)
+                return _MISSING
+            self.items.move_to_end(key)
+        # Unpickled per read, callers may change what they get
+        return pickle.loads(pickled)
+
+    def set(self, key, value, ttl):
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self.lock:
+            self._delete(key)
+            if ttl <= 0 or len(pickled) > self.max_item_bytes:
+                return
+            self.items[key] = (pickled, time.monotonic() + ttl)
+            self.bytes += len(pickled)
+            # Least recently used first
+            while len(self.items) > self.max_entries or (
+                self.bytes > self.max_bytes
+            ):
+                _, (evicted, _) = self.items.popitem(last=False)
+                self.bytes -= len(evicted)
+
+    def delete(self, key):
+        with self.lock:
+            self._delete(key)
+
+    def _delete(self, key):
+        item = self.items.pop(key, None)
+        if item is not None:
+            self.bytes -= len(item[0])
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        lookups = sum(self.counts.values())
+        return {
+            "lookups": lookups,
+            "local_hits": self.counts["local"],
+            "shared_hits": self.counts["shared"],
+            "misses": self.counts["miss"],
+            "local_hit_ratio": (
+                round(self.counts["local"] / lookups, 3) if lookups else 0
+            ),
+            "shared_hit_ratio": (
+                round(self.counts["shared"] / lookups, 3) if lookups else 0
+            ),
+            "local_entries": len(self.items),
+            "local_bytes": self.bytes,
+        }
+
+
+class TwoTierCache(BaseCache):
+    """
+    A bounded in-process LRU in front of a shared cache, like memcached.
+
+    Values read or written by this process are kept locally for at most
+    LOCAL_TTL seconds, so hot keys cost a dict lookup instead of a round
+    trip, and changes made by other processes show up after that long.
+    add, incr and decr are atomic operations of the shared cache and
+    always go to it.
+
+    OPTIONS:
+        SHARED_BACKEND: dotted path of the shared cache backend
+        SHARED_OPTIONS: OPTIONS of the shared cache backend
+        LOCAL_TTL, LOCAL_MAX_ENTRIES, LOCAL_MAX_BYTES,
+        LOCAL_MAX_ITEM_BYTES: limits of the local tier
+        STATS_INTERVAL: seconds between hit ratio reports on stdout,
+        0 for none
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        shared_params = {
+            **params,
+            "OPTIONS": options.get("SHARED_OPTIONS", {}),
+        }
+        self.shared = import_string(options["SHARED_BACKEND"])(
+            location, shared_params
+        )
+
+        self.local_ttl = options.get("LOCAL_TTL", LOCAL_TTL_SECS)
+        self.stats_interval = options.get("STATS_INTERVAL", 0)
+        with _local_tiers_lock:
+            self.local = _local_tiers.setdefault(
+                location,
+                LocalTier(
+                    options.get("LOCAL_MAX_ENTRIES", LOCAL_MAX_ENTRIES),
+                    options.get("LOCAL_MAX_BYTES", LOCAL_MAX_BYTES),
+                    options.get("LOCAL_MAX_ITEM_BYTES", LOCAL_MAX_ITEM_BYTES),
+                ),
+            )
+
+    def _local_ttl(self, timeout=None):
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None:
+            return self.local_ttl
+        return min(self.local_ttl, timeout)
+
+    def _count(self, tier):
+        self.local.counts[tier] += 1
+        now = time.monotonic()
+        if self.stats_interval and now - self.local.stats_at > (
+            self.stats_interval
+        ):
+            self.local.stats_at = now
+            print(f"Cache stats of pid {os.getpid()}: {self.stats()}")
+
+    def stats(self) -> dict:
+        return self.local.stats()
+
+    def get(self, key, default=None, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        value = self.local.get(local_key)
+        if value is not _MISSING:
+            self._count("local")
+            return value
+
+        value = self.shared.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            self._count("miss")
+            return default
+
+        self._count("shared")
+        self.local.set(local_key, value, self._local_ttl())
+        return value
+
+    def get_many(self, keys, version=None):
+        values = {}
+        shared_keys = []
+        for key in keys:
+            value = self.local.get(self.make_and_validate_key(key, version))
+            if value is _MISSING:
+                shared_keys.append(key)
+            else:
+                self._count("local")
+                values[key] = value
+
+        if shared_keys:
+            shared_values = self.shared.get_many(shared_keys, version=version)
+            for key in shared_keys:
+                if key not in shared_values:
+                    self._count("miss")
+                    continue
+                self._count("shared")
+                values[key] = shared_values[key]
+                self.local.set(
+                    self.make_and_validate_key(key, version),
+                    shared_values[key],
+                    self._local_ttl(),
+                )
+        return values
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, timeout, version=version)
+        self.local.set(
+            self.make_and_validate_key(key, version=version),
+            value,
+            self._local_ttl(timeout),
+        )
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed_keys = self.shared.set_many(data, timeout, version=version)
+        for key, value in data.items():
+            if key not in failed_keys:
+                self.local.set(
+                    self.make_and_validate_key(key, version=version),
+                    value,
+                    self._local_ttl(timeout),
+                )
+        return failed_keys
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        # Used as a lock, so only the shared cache can answer
+        self.local.delete(self.make_and_validate_key(key, version=version))
+        return self.shared.add(key, value, timeout, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        self.local.delete(self.make_and_validate_key(key, version=version))
+        return self.shared.incr(key, delta, version=version)
+
+    def decr(self, key, delta=1, version=None):
+        self.local.delete(self.make_and_validate_key(key, version=version))
+        return self.shared.decr(key, delta, version=version)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, timeout, version=version)
+
+    def has_key(self, key, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        if self.local.get(local_key) is not _MISSING:
+            return True
+        return self.shared.has_key(key, version=version)
+
+    def delete(self, key, version=None):
+        self.local.delete(self.make_and_validate_key(key, version=version))
+        return self.shared.delete(key, version=version)
+
+    def delete_many(self, keys, version=None):
+        for key in keys:
+            self.local.delete(self.make_and_validate_key(key, version))
+        self.shared.delete_many(keys, version=version)
+
+    def clear(self):
+        self.local.clear()
+        self.shared.clear()
+
+    def close(self, **kwargs):
+        self.shared.close(**kwargs)
@@ -0,0 +1,54 @@
+import collections
+import threading
+import time
+
+from brand.models import Tag
+from utilities.cache import cache_generation
+
+CATEGORY_TAGS_TTL_SECS = 300
+
+
+class CategoryTags:
+    """
+    In-process copy of the (name, value) tags of every category, reloaded
+    every ttl_secs and whenever the cache generation changed, so pages
+    recomputed for a new generation never show older tags.
+    """
+
+    def __init__(self, ttl_secs):
+        self.ttl_secs = ttl_secs
+        self.loaded_at = None
+        self.generation = None
+        self.category__tags = {}
+        self.lock = threading.Lock()
+
+    def is_stale(self, generation) -> bool:
+        return (
+            self.loaded_at is None
+            or generation != self.generation
+            or time.monotonic() - self.loaded_at > self.ttl_secs
+        )
+
+    def load(self, generation):
+        category__tags = collections.defaultdict(list)
+        for internal_name, tag_name, tag_value in Tag.objects.order_by(
+            "pk"
+        ).values_list("category__internal_name", "name", "value"):
+            category__tags[internal_name].append((tag_name, tag_value))
+
+        self.category__tags = dict(category__tags)
+        # Read before the tags, so a bump during the load reloads them
+        self.generation = generation
+        self.loaded_at = time.monotonic()
+
+    def get(self, internal_name) -> [tuple]:
+        generation = cache_generation()
+        if self.is_stale(generation):
+            with self.lock:
+                # Another thread may have reloaded while this one waited
+                if self.is_stale(generation):
+                    self.load(generation)
+        return self.category__tags.get(internal_name, [])
+
+
+CATEGORY_TAGS = CategoryTags(CATEGORY_TAGS_TTL_SECS)
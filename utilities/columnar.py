@@ -0,0 +1,128 @@
+import itertools
+import math
+
+PARQUET_MAGIC = b"PAR1"
+ARROW_MAGIC = b"ARROW1"
+COLUMNAR_BATCH_SIZE = 5000
+
+
+class ColumnarError(Exception):
+    pass
+
+
+def _pyarrow():
+    # Optional dependency, only needed for Parquet and Arrow sheets
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise ColumnarError("Reading Parquet or Arrow needs pyarrow.")
+    return pyarrow
+
+
+def columnar_format(file_path):
+    with open(file_path, "rb") as f:
+        magic = f.read(len(ARROW_MAGIC))
+
+    if magic.startswith(PARQUET_MAGIC):
+        return "parquet"
+    if magic == ARROW_MAGIC:
+        return "arrow"
+    return None
+
+
+def open_columnar(file_path, columnar_format):
+    pyarrow = _pyarrow()
+    if columnar_format == "parquet":
+        return pyarrow.parquet.ParquetFile(file_path, memory_map=True)
+    return pyarrow.ipc.open_file(pyarrow.memory_map(file_path))
+
+
+def columnar_header(reader) -> [str]:
+    if hasattr(reader, "schema_arrow"):
+        return reader.schema_arrow.names
+    return reader.schema.names
+
+
+def columnar_row_count(reader) -> int:
+    if hasattr(reader, "iter_batches"):
+        return reader.metadata.num_rows
+    return sum(
+        reader.get_batch(batch_idx).num_rows
+        for batch_idx in range(reader.num_record_batches)
+    )
+
+
+def _cell_to_str(value) -> str:
+    # Rows look like csv.DictReader rows: missing values are empty strings
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        if math.isnan(value):
+            return ""
+        if value.is_integer():
+            return str(int(value))
+    return str(value)
+
+
+def _parquet_batches(reader, columns, start):
+    # Whole row groups before start are skipped using the footer only
+    row_groups = []
+    for row_group in range(reader.num_row_groups):
+        num_rows = reader.metadata.row_group(row_group).num_rows
+        if not row_groups and start >= num_rows:
+            start -= num_rows
+            continue
+        row_groups.append(row_group)
+
+    if not row_groups:
+        return start, iter([])
+
+    batches = reader.iter_batches(
+        batch_size=COLUMNAR_BATCH_SIZE,
+        row_groups=row_groups,
+        columns=columns,
+    )
+    return start, batches
+
+
+def _arrow_batches(reader, columns, start):
+    def batches():
+        for batch_idx in range(reader.num_record_batches):
+            yield reader.get_batch(batch_idx)
+
+    return start, batches()
+
+
+def columnar_to_dict_iter(reader, columns=None, start=0, count=0):
+    header = columnar_header(reader)
+    columns = header if columns is None else columns
+
+    if hasattr(reader, "iter_batches"):
+        skip, batches = _parquet_batches(reader, columns, start)
+    else:
+        skip, batches = _arrow_batches(reader, columns, start)
+
+    def rows():
+        nonlocal skip
+        for batch in batches:
+            # Skipped Arrow batches are memory mapped and never decoded
+            if skip >= batch.num_rows:
+                skip -= batch.num_rows
+                continue
+
+            batch = batch.slice(skip)
+            skip = 0
+            # Only the requested columns are converted to Python objects
+            values = [
+                map(_cell_to_str, batch.column(column).to_pylist())
+                for column in columns
+            ]
+            for row in zip(*values):
+                yield dict(zip(columns, row))
+
+    if count > 0:
+        yield from itertools.islice(rows(), count)
+    else:
+        yield from rows()
@@ -1,17 +1,41 @@
 import csv
 import hashlib
+import itertools
+import sys
 
+HASH_CHUNK_SIZE = 64 * 1024
 
-def csv_to_dict_list(csv_file_path):
-    arr = []
 
-    with open(csv_file_path, encoding="utf-8") as csvf:
-        csv_reader = csv.DictReader(csvf)
-        for row in csv_reader:
-            arr.append(row)
+def csv_header(csv_file) -> [str]:
+    csv_file.seek(0)
+    return [sys.intern(col) for col in next(csv.reader(csv_file), [])]
 
-    return arr
+
+def csv_to_dict_iter(csv_file, start=0, count=0):
+    csv_file.seek(0)
+    csv_reader = csv.DictReader(csv_file)
+    # Repeated column names share one interned key across all rows
+    csv_reader.fieldnames = [
+        sys.intern(col) for col in csv_reader.fieldnames or []
+    ]
+
+    # Skip raw rows without building dicts for them. Blank lines are
+    # ignored the same way DictReader ignores them.
+    for _ in itertools.islice(filter(None, csv_reader.reader), start):
+        pass
+
+    if count > 0:
+        yield from itertools.islice(csv_reader, count)
+    else:
+        yield from csv_reader
 
 
 def str_to_md5(string) -> str:
     return hashlib.md5(string.encode()).hexdigest()
+
+
+def file_to_sha256(file_obj) -> str:
+    sha256 = hashlib.sha256()
+    for chunk in iter(lambda: file_obj.read(HASH_CHUNK_SIZE), b""):
+        sha256.update(chunk)
+    return sha256.hexdigest()
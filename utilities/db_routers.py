@@ -0,0 +1,108 @@
+import contextvars
+import functools
+import random
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+PIN_PRIMARY_COOKIE = "pin_primary"
+# Longer than the replication lag we expect
+PIN_PRIMARY_SECS = 10
+
+_read_from_replica = contextvars.ContextVar("read_from_replica", default=False)
+_pinned_to_primary = contextvars.ContextVar("pinned_to_primary", default=False)
+_wrote_to_primary = contextvars.ContextVar("wrote_to_primary", default=False)
+
+
+def use_read_replica(view):
+    """
+    Sends the reads of view to a replica, unless the client wrote
+    recently. Views that are not marked read from the primary.
+    """
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        token = _read_from_replica.set(True)
+        try:
+            return view(*args, **kwargs)
+        finally:
+            _read_from_replica.reset(token)
+
+    return wrapper
+
+
+def pinned_to_primary() -> bool:
+    return _pinned_to_primary.get()
+
+
+def read_from_primary(func, *args, **kwargs):
+    """
+    Calls func with its reads on the primary, even inside a view marked
+    with use_read_replica.
+    """
+    token = _pinned_to_primary.set(True)
+    try:
+        return func(*args, **kwargs)
+    finally:
+        _pinned_to_primary.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Reads of views marked with use_read_replica go to one of
+    settings.DATABASE_REPLICAS. Everything else, all writes and all
+    migrations use the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        if (
+            settings.DATABASE_REPLICAS
+            and _read_from_replica.get()
+            and not _pinned_to_primary.get()
+            # Reads after a write in the same request must see it
+            and not _wrote_to_primary.get()
+        ):
+            return random.choice(settings.DATABASE_REPLICAS)
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        _wrote_to_primary.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class PinPrimaryMiddleware:
+    """
+    After a request that wrote, the client reads from the primary for
+    PIN_PRIMARY_SECS, so it sees its own writes before the replicas do.
+    Must come first in MIDDLEWARE to see the session writes too.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        pinned_token = _pinned_to_primary.set(
+            PIN_PRIMARY_COOKIE in request.COOKIES
+        )
+        wrote_token = _wrote_to_primary.set(False)
+        try:
+            response = self.get_response(request)
+            if _wrote_to_primary.get():
+                response.set_cookie(
+                    PIN_PRIMARY_COOKIE,
+                    "1",
+                    max_age=PIN_PRIMARY_SECS,
+                    httponly=True,
+                    samesite="Lax",
+                )
+        finally:
+            _pinned_to_primary.reset(pinned_token)
+            _wrote_to_primary.reset(wrote_token)
+        return response
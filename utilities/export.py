@@ -0,0 +1,268 @@
+import csv
+import io
+import json
+import urllib.parse
+import zlib
+
+from django.db.models import Prefetch
+
+from brand.models import Brand, BrandAsset, BrandKeyPerson, BrandTag
+from utilities.imports import REMAINING_BRANDASSET_SUPPLY
+
+EXPORT_FORMATS = ["csv", "jsonl"]
+EXPORT_CHUNK_SIZE = 500
+# import_category splits multiple choice answers on ","
+MULTIPLE_CHOICE_SEPARATOR = ", "
+GZIP_WBITS = 31
+
+
+def _filter_rules(model_rules):
+    return model_rules["pre"].get("foreign", {}).get("filter_multiple", {})
+
+
+def _create_rules(model_rules):
+    return model_rules["pre"].get("foreign", {}).get("create", {})
+
+
+def export_columns(all_model_rules) -> [str]:
+    """
+    The source columns of the import rules, in rule order, so that an
+    export can be imported again with import_category.
+    """
+    columns = []
+
+    def add(column):
+        if column not in columns:
+            columns.append(column)
+
+    for model_rules in all_model_rules.values():
+        for field_rule in model_rules["fields"].values():
+            if "source" in field_rule:
+                add(field_rule["source"])
+        for create_rule in _create_rules(model_rules).values():
+            for supply_rule in create_rule["supply"].values():
+                if "source" in supply_rule:
+                    add(supply_rule["source"])
+        for filter_rules in _filter_rules(model_rules).values():
+            for filter_rule in filter_rules:
+                add(list(filter_rule["source"].values())[0])
+
+    for supply in REMAINING_BRANDASSET_SUPPLY:
+        add(supply["asset"]["source"])
+
+    return columns
+
+
+def _file_url(field_file, base_url):
+    if not field_file:
+        return ""
+    return urllib.parse.urljoin(base_url, field_file.url)
+
+
+def _export_fields(row, model_rules, model_obj, base_url):
+    for field_name, field_rule in model_rules["fields"].items():
+        column = field_rule.get("source")
+        if column is None:
+            continue
+
+        value = None if model_obj is None else getattr(model_obj, field_name)
+        field_type = field_rule["type"]
+        if field_type == "enum":
+            # Values missing from the choices are left for the defaults
+            value_to_choice = {
+                choice_value: choice
+                for choice, choice_value in reversed(
+                    field_rule["choices"].items()
+                )
+            }
+            row[column] = value_to_choice.get(value, "")
+        elif field_type == "multiple_choice":
+            answers = [row[column]] if row.get(column) else []
+            answers.extend(
+                answer
+                for answer, answer_value in field_rule["contains"].items()
+                if value == answer_value
+            )
+            row[column] = MULTIPLE_CHOICE_SEPARATOR.join(answers)
+        elif field_type == "image":
+            row[column] = _file_url(value, base_url)
+        else:
+            row[column] = "" if value is None else str(value)
+
+
+def _export_filtered(row, model_rules, related_objs):
+    # Inverse of filter_multiple: the values of the foreign objects the
+    # importer would have looked up, joined like multiple choice answers
+    fk_fields = {
+        field_rule["model"]: field_name
+        for field_name, field_rule in model_rules["fields"].items()
+        if field_rule["type"] == "FK"
+    }
+    for foreign_model_name, filter_rules in _filter_rules(model_rules).items():
+        foreign_objs = [
+            getattr(related_obj, fk_fields[foreign_model_name])
+            for related_obj in related_objs
+        ]
+        for filter_rule in filter_rules:
+            field_name, column = list(filter_rule["source"].items())[0]
+            row[column] = MULTIPLE_CHOICE_SEPARATOR.join(
+                str(getattr(foreign_obj, field_name))
+                for foreign_obj in foreign_objs
+                if all(
+                    getattr(foreign_obj, static_name) == static_value
+                    for static_name, static_value in filter_rule.get(
+                        "static", {}
+                    ).items()
+                )
+            )
+
+
+def _brand_visual(brand):
+    try:
+        return brand.brandvisual
+    except Brand.brandvisual.RelatedObjectDoesNotExist:
+        return None
+
+
+def brand_to_row(brand, all_model_rules, base_url) -> dict:
+    row = {}
+    _export_fields(row, all_model_rules["Brand"], brand, base_url)
+
+    key_people = brand.brandkeyperson_set.all()
+    person = key_people[0].person if key_people else None
+    _export_fields(row, all_model_rules["Person"], person, base_url)
+
+    brand_visual = _brand_visual(brand)
+    for field_name, create_rule in _create_rules(
+        all_model_rules["BrandVisual"]
+    ).items():
+        column = create_rule["supply"]["asset"].get("source")
+        if column is not None:
+            asset = getattr(brand_visual, field_name, None)
+            row[column] = _file_url(asset and asset.asset, base_url)
+
+    _export_filtered(
+        row,
+        all_model_rules["BrandOnlineStore"],
+        brand.brandonlinestore_set.all(),
+    )
+    _export_filtered(
+        row, all_model_rules["BrandTag"], brand.brandtag_set.all()
+    )
+
+    title__asset = {}
+    for brand_asset in brand.brandasset_set.all():
+        title__asset.setdefault(brand_asset.title, brand_asset.asset)
+    for supply in REMAINING_BRANDASSET_SUPPLY:
+        row[supply["asset"]["source"]] = _file_url(
+            title__asset.get(supply["title"]["static"]), base_url
+        )
+
+    return row
+
+
+def category_brands(category, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Brands of category with everything the export needs. Brands are read
+    in primary key ranges of chunk_size, each with its own prefetch
+    queries, so memory does not grow with the catalog.
+    """
+    brands = (
+        Brand.objects.filter(brandcategory__category=category)
+        .select_related("brandvisual__logo", "brandvisual__cover")
+        .prefetch_related(
+            "brandonlinestore_set__online_store",
+            Prefetch(
+                "brandtag_set",
+                queryset=BrandTag.objects.filter(tag__category=category)
+                .select_related("tag")
+                .order_by("tag__sequence", "pk"),
+            ),
+            Prefetch(
+                "brandkeyperson_set",
+                queryset=BrandKeyPerson.objects.filter(
+                    designation=BrandKeyPerson.Designation.FOUNDER
+                )
+                .select_related("person")
+                .order_by("pk"),
+            ),
+            Prefetch(
+                "brandasset_set",
+                queryset=BrandAsset.objects.filter(
+                    title__in=[
+                        supply["title"]["static"]
+                        for supply in REMAINING_BRANDASSET_SUPPLY
+                    ]
+                ).order_by("sequence", "pk"),
+            ),
+        )
+        .order_by("pk")
+    )
+
+    # Keyset pagination instead of one long query, MySQL clients buffer
+    # the whole result set of a query
+    last_pk = 0
+    while True:
+        chunk = list(brands.filter(pk__gt=last_pk)[:chunk_size])
+        yield from chunk
+        if len(chunk) < chunk_size:
+            return
+        last_pk = chunk[-1].pk
+
+
+def csv_chunks(columns, rows):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns)
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+
+def jsonl_chunks(columns, rows):
+    for row in rows:
+        yield (
+            json.dumps(
+                {column: row[column] for column in columns},
+                ensure_ascii=False,
+            )
+            + "\n"
+        ).encode("utf-8")
+
+
+def gzip_chunks(chunks):
+    compressor = zlib.compressobj(wbits=GZIP_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export_category(
+    category,
+    all_model_rules,
+    export_format="csv",
+    compress=False,
+    base_url="",
+    chunk_size=EXPORT_CHUNK_SIZE,
+):
+    """
+    Streams the brands of category as encoded CSV or JSON Lines chunks,
+    gzipped if compress is set.
+    """
+    columns = export_columns(all_model_rules)
+    rows = (
+        brand_to_row(brand, all_model_rules, base_url)
+        for brand in category_brands(category, chunk_size)
+    )
+
+    if export_format == "jsonl":
+        chunks = jsonl_chunks(columns, rows)
+    else:
+        chunks = csv_chunks(columns, rows)
+
+    return gzip_chunks(chunks) if compress else chunks
@@ -0,0 +1,180 @@
+import os
+import sqlite3
+from pathlib import Path
+
+from django.conf import settings
+
+from utilities.dates import current_india_time
+
+MANIFEST_FILE_NAME = "image_manifest.sqlite3"
+MANIFEST_BUSY_TIMEOUT_SECS = 30
+IMAGE_SHARD_PREFIX_LEN = 2
+
+
+def manifest_path() -> Path:
+    return Path(settings.DATA_ROOT) / MANIFEST_FILE_NAME
+
+
+class ImageManifest:
+    """
+    Persistent record of downloaded images, keyed by the md5 of their
+    source url: file name in the image directory, content hash and the
+    ETag/Last-Modified validators of the response.
+
+    Images are stored in subdirectories named after the first characters
+    of their key. Everything is loaded once per process, together with
+    one scan of the image directory, so lookups never touch the disk.
+    """
+
+    def __init__(self, image_dir):
+        self.image_dir = image_dir
+        self.refresh = False
+        self.pid = None
+        # Keys fetched or revalidated by this process
+        self.fresh = set()
+
+    def configure(self, refresh=False):
+        self.refresh = refresh
+
+    def _load(self):
+        # A connection must not be shared with forked import workers
+        if self.pid == os.getpid():
+            return
+        self.pid = os.getpid()
+
+        path = manifest_path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(path, timeout=MANIFEST_BUSY_TIMEOUT_SECS)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS image ("
+            "  key TEXT PRIMARY KEY,"
+            "  file_name TEXT NOT NULL,"
+            "  content_hash TEXT,"
+            "  etag TEXT,"
+            "  last_modified TEXT,"
+            "  fetched_at TEXT"
+            ")"
+        )
+        self.entries = {
+            row["key"]: dict(row)
+            for row in self.db.execute("SELECT * FROM image")
+        }
+
+        os.makedirs(self.image_dir, exist_ok=True)
+        self.shard_dirs = set()
+        self.file_names = self._scan_image_dir()
+
+        # Images downloaded before the manifest existed are adopted as is
+        adopted = []
+        for file_name in self.file_names:
+            key, extension = os.path.splitext(file_name)
+            if key not in self.entries and extension and "." not in key:
+                adopted.append({"key": key, "file_name": file_name})
+        self.write_entries(adopted)
+
+    def _scan_image_dir(self):
+        file_names = set()
+        with os.scandir(self.image_dir) as dir_entries:
+            for dir_entry in dir_entries:
+                if dir_entry.is_dir():
+                    with os.scandir(dir_entry.path) as shard_entries:
+                        file_names.update(
+                            shard_entry.name
+                            for shard_entry in shard_entries
+                            if not shard_entry.name.endswith(".part")
+                        )
+                    self.shard_dirs.add(dir_entry.path)
+                elif not dir_entry.name.endswith(".part"):
+                    # Left over from the flat layout, moved into its shard
+                    try:
+                        os.replace(
+                            dir_entry.path, self.image_path(dir_entry.name)
+                        )
+                    except FileNotFoundError:
+                        # Already moved by a parallel importer
+                        pass
+                    file_names.add(dir_entry.name)
+        return file_names
+
+    def image_path(self, file_name):
+        shard_dir = os.path.join(
+            self.image_dir, file_name[:IMAGE_SHARD_PREFIX_LEN]
+        )
+        if shard_dir not in self.shard_dirs:
+            os.makedirs(shard_dir, exist_ok=True)
+            self.shard_dirs.add(shard_dir)
+        return os.path.join(shard_dir, file_name)
+
+    def is_fresh(self, key) -> bool:
+        return key in self.fresh
+
+    def mark_fresh(self, key):
+        self.fresh.add(key)
+
+    def get(self, key):
+        self._load()
+        return self.entries.get(key)
+
+    def has_file(self, key) -> bool:
+        self._load()
+        entry = self.entries.get(key)
+        return entry is not None and entry["file_name"] in self.file_names
+
+    def file_path(self, key):
+        if not self.has_file(key):
+            return None
+        file_name = self.entries[key]["file_name"]
+        return os.path.join(
+            self.image_dir, file_name[:IMAGE_SHARD_PREFIX_LEN], file_name
+        )
+
+    def record(
+        self,
+        key,
+        file_name,
+        content_hash=None,
+        etag=None,
+        last_modified=None,
+    ):
+        self._load()
+        self.fresh.add(key)
+        self.write_entries(
+            [
+                {
+                    "key": key,
+                    "file_name": file_name,
+                    "content_hash": content_hash,
+                    "etag": etag,
+                    "last_modified": last_modified,
+                    "fetched_at": current_india_time().isoformat(),
+                }
+            ]
+        )
+
+    def write_entries(self, entries):
+        if not entries:
+            return
+
+        columns = [
+            "key",
+            "file_name",
+            "content_hash",
+            "etag",
+            "last_modified",
+            "fetched_at",
+        ]
+        rows = [[entry.get(column) for column in columns] for entry in entries]
+        with self.db:
+            self.db.executemany(
+                f"INSERT OR REPLACE INTO image ({', '.join(columns)}) "
+                f"VALUES ({', '.join('?' for _ in columns)})",
+                rows,
+            )
+
+        for entry in entries:
+            self.entries[entry["key"]] = {
+                column: entry.get(column) for column in columns
+            }
+            self.file_names.add(entry["file_name"])
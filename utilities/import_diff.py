@@ -0,0 +1,345 @@
+from brand.models import (
+    Brand,
+    BrandAsset,
+    BrandCategory,
+    BrandKeyPerson,
+    BrandOnlineStore,
+    BrandTag,
+    OnlineStore,
+    Person,
+    Tag,
+)
+from utilities.converters import file_to_sha256
+from utilities.imports import (
+    ROW_ERRORS,
+    cached_image_hash,
+    cached_image_path,
+    changed_fields,
+    import_as_brand,
+    import_as_person,
+    updatable_fields,
+)
+from utilities.validators import is_none_or_empty_string
+
+DIFF_BATCH_SIZE = 500
+
+
+def _new_report():
+    return {
+        "rows": 0,
+        "ignored_rows": 0,
+        "Brand": {"create": [], "skip": [], "update": {}},
+        "Person": {"create": [], "skip": []},
+        "BrandKeyPerson": {"create": 0, "skip": 0},
+        "BrandOnlineStore": {"create": 0, "skip": 0},
+        "BrandCategory": {"create": 0, "skip": 0},
+        "BrandTag": {"create": 0, "skip": 0},
+        "BrandAsset": {"create": 0, "skip": 0, "download": 0},
+        "unknown": [],
+        "invalid": [],
+    }
+
+
+def _lookup_key(filter_plan, answer):
+    return (tuple(sorted(filter_plan["static"].items())), answer.lower())
+
+
+def _filter_answers(filter_plan, csv_row):
+    for answer in csv_row[filter_plan["column"]].split(","):
+        answer = answer.strip()
+        # Empty cells have no answers
+        if answer:
+            yield filter_plan["replace"].get(answer, answer)
+
+
+def _asset_columns(import_plan) -> [tuple]:
+    plans = [plan for _, plan in import_plan["BrandVisual"]["create"]]
+    plans += import_plan["remaining_brandassets"]
+    # The titles are static
+    return [
+        (plan["columns"]["asset"], dict(plan["fields"])["title"]({}, {}))
+        for plan in plans
+    ]
+
+
+class _ImportDiff:
+    def __init__(self, import_plan, category):
+        self.import_plan = import_plan
+        self.category = category
+        self.report = _new_report()
+
+        self.brand_compare_fields = updatable_fields(import_plan["Brand"])
+        self.person_name_column = import_plan["Person"]["columns"]["name"]
+        self.asset_columns = _asset_columns(import_plan)
+
+        # Reference data is small, so it is read once for the whole run
+        self.lookups = {
+            "Tag": {
+                ((("name", tag.name),), tag.value.lower()): tag.id
+                for tag in Tag.objects.filter(category=category)
+            },
+            "OnlineStore": {
+                ((), store.name.lower()): store.id
+                for store in OnlineStore.objects.all()
+            },
+        }
+
+        # Existing pairs plus those created by earlier rows of this run
+        self.seen_brands = {}
+        self.seen_persons = set()
+        self.seen_pairs = set()
+        self.seen_assets = set()
+
+    def add_batch(self, indexed_rows):
+        incoming = []
+        for idx, csv_row in indexed_rows:
+            self.report["rows"] += 1
+            try:
+                brand = import_as_brand(self.import_plan, csv_row)
+            except ROW_ERRORS as e:
+                # The import would roll this row back
+                self.report["invalid"].append((idx, repr(e)))
+                continue
+            if brand is None:
+                self.report["ignored_rows"] += 1
+                continue
+            incoming.append((idx, brand, csv_row))
+
+        brand_names = {brand.name for _, brand, _ in incoming}
+        person_names = {
+            csv_row.get(self.person_name_column, "").strip()
+            for _, _, csv_row in incoming
+        }
+        existing_brands = {}
+        for brand in Brand.objects.filter(name__in=brand_names):
+            existing_brands.setdefault(brand.name, brand)
+        existing_persons = set(
+            Person.objects.filter(name__in=person_names).values_list(
+                "name", flat=True
+            )
+        )
+        existing_pairs = self._existing_pairs(existing_brands.values())
+        image_hashes = self._image_hashes(incoming)
+        self.seen_assets |= set(
+            BrandAsset.objects.filter(
+                brand_id__in=[brand.id for brand in existing_brands.values()],
+                content_hash__in=set(image_hashes.values()),
+            ).values_list("brand_id", "title", "content_hash")
+        )
+
+        self.seen_pairs |= existing_pairs
+        for idx, brand, csv_row in incoming:
+            try:
+                self._check_person(csv_row, existing_persons)
+                brand_key = self._diff_brand(brand, existing_brands)
+            except ROW_ERRORS as e:
+                self.report["invalid"].append((idx, repr(e)))
+                continue
+            self._diff_person(brand_key, csv_row, existing_persons)
+            self._diff_pairs(brand_key, csv_row)
+            self._diff_assets(brand_key, csv_row, image_hashes)
+
+    def _existing_pairs(self, brands):
+        pairs = set()
+        brand_ids = [brand.id for brand in brands]
+        if not brand_ids:
+            return pairs
+
+        for brand_id, online_store_id in BrandOnlineStore.objects.filter(
+            brand_id__in=brand_ids
+        ).values_list("brand_id", "online_store_id"):
+            pairs.add(("BrandOnlineStore", brand_id, online_store_id))
+        for brand_id, tag_id in BrandTag.objects.filter(
+            brand_id__in=brand_ids
+        ).values_list("brand_id", "tag_id"):
+            pairs.add(("BrandTag", brand_id, tag_id))
+        for brand_id, person_name in BrandKeyPerson.objects.filter(
+            brand_id__in=brand_ids
+        ).values_list("brand_id", "person__name"):
+            pairs.add(("BrandKeyPerson", brand_id, person_name))
+        for brand_id in BrandCategory.objects.filter(
+            brand_id__in=brand_ids, category=self.category
+        ).values_list("brand_id", flat=True):
+            pairs.add(("BrandCategory", brand_id, self.category.id))
+        return pairs
+
+    def _image_hashes(self, incoming):
+        image_hashes = {}
+        for _, _, csv_row in incoming:
+            for column, _ in self.asset_columns:
+                image_src = csv_row.get(column)
+                if is_none_or_empty_string(image_src):
+                    continue
+                image_path = cached_image_path(image_src)
+                if image_path is None or image_src in image_hashes:
+                    continue
+
+                # The manifest knows the hash of most downloaded images
+                content_hash = cached_image_hash(image_src)
+                if content_hash is None:
+                    with open(image_path, "rb") as f:
+                        content_hash = file_to_sha256(f)
+                image_hashes[image_src] = content_hash
+        return image_hashes
+
+    def _count(self, model_name, exists):
+        self.report[model_name]["skip" if exists else "create"] += 1
+
+    def _diff_brand(self, brand, existing_brands):
+        report = self.report["Brand"]
+        if brand.name in self.seen_brands:
+            report["skip"].append(brand.name)
+            return self.seen_brands[brand.name]
+
+        existing = existing_brands.get(brand.name)
+        if existing is None:
+            # The import cleans new brands before saving them
+            brand.clean_fields()
+            report["create"].append(brand.name)
+            brand_key = f"new:{brand.name}"
+        else:
+            # Raises before anything of the row is counted
+            changed = changed_fields(
+                existing, brand, self.brand_compare_fields
+            )
+            report["skip"].append(brand.name)
+            brand_key = existing.id
+            if changed:
+                report["update"][brand.name] = changed
+
+        self.seen_brands[brand.name] = brand_key
+        return brand_key
+
+    def _check_person(self, csv_row, existing_persons):
+        # Existing people are used as they are, new ones are cleaned
+        person = import_as_person(
+            self.import_plan, csv_row, download_images=False
+        )
+        if person is None:
+            return
+        if not (
+            person.name in existing_persons or person.name in self.seen_persons
+        ):
+            person.clean_fields()
+
+    def _diff_person(self, brand_key, csv_row, existing_persons):
+        person_name = csv_row.get(self.person_name_column, "").strip()
+        if not person_name:
+            return
+
+        report = self.report["Person"]
+        if person_name in existing_persons or person_name in self.seen_persons:
+            report["skip"].append(person_name)
+        else:
+            report["create"].append(person_name)
+            self.seen_persons.add(person_name)
+
+        self._diff_pair("BrandKeyPerson", brand_key, person_name)
+
+    def _diff_pair(self, model_name, brand_key, other_key):
+        pair = (model_name, brand_key, other_key)
+        self._count(model_name, pair in self.seen_pairs)
+        self.seen_pairs.add(pair)
+
+    def _diff_pairs(self, brand_key, csv_row):
+        self._diff_pair("BrandCategory", brand_key, self.category.id)
+
+        for model_name in ["BrandOnlineStore", "BrandTag"]:
+            for filter_plan in self.import_plan[model_name]["filter_multiple"]:
+                lookup = self.lookups[filter_plan["model_name"]]
+                for answer in _filter_answers(filter_plan, csv_row):
+                    other_id = lookup.get(_lookup_key(filter_plan, answer))
+                    if other_id is None:
+                        self.report["unknown"].append(
+                            (filter_plan["column"], answer)
+                        )
+                        continue
+                    self._diff_pair(model_name, brand_key, other_id)
+
+    def _diff_assets(self, brand_key, csv_row, image_hashes):
+        report = self.report["BrandAsset"]
+        for column, title in self.asset_columns:
+            image_src = csv_row.get(column)
+            if is_none_or_empty_string(image_src):
+                continue
+
+            content_hash = image_hashes.get(image_src)
+            asset_key = (brand_key, title, content_hash)
+            if content_hash is None:
+                report["download"] += 1
+            elif asset_key in self.seen_assets:
+                report["skip"] += 1
+            else:
+                report["create"] += 1
+                self.seen_assets.add(asset_key)
+
+
+def diff_import(
+    import_plan, category, indexed_rows, batch_size=DIFF_BATCH_SIZE
+):
+    """
+    Predicts what importing indexed_rows, pairs of row idx and row,
+    would create, skip and update, without writing anything.
+    """
+    import_diff = _ImportDiff(import_plan, category)
+
+    batch = []
+    for idx__csv_row in indexed_rows:
+        batch.append(idx__csv_row)
+        if len(batch) >= batch_size:
+            import_diff.add_batch(batch)
+            batch = []
+    if batch:
+        import_diff.add_batch(batch)
+
+    return import_diff.report
+
+
+def report_lines(report) -> [str]:
+    lines = [
+        f"Rows read: {report['rows']} ({report['ignored_rows']} ignored)",
+        f"Brand: {len(report['Brand']['create'])} to create, "
+        f"{len(report['Brand']['skip'])} to skip, "
+        f"{len(report['Brand']['update'])} with changed fields",
+    ]
+    for brand_name in report["Brand"]["create"]:
+        lines.append(f"  + {brand_name}")
+    for brand_name, changed in report["Brand"]["update"].items():
+        lines.append(f"  ~ {brand_name}: {', '.join(changed)}")
+
+    lines.append(
+        f"Person: {len(report['Person']['create'])} to create, "
+        f"{len(report['Person']['skip'])} to skip"
+    )
+    for model_name in [
+        "BrandKeyPerson",
+        "BrandOnlineStore",
+        "BrandCategory",
+        "BrandTag",
+    ]:
+        lines.append(
+            f"{model_name}: {report[model_name]['create']} to create, "
+            f"{report[model_name]['skip']} to skip"
+        )
+
+    assets = report["BrandAsset"]
+    lines.append(
+        f"BrandAsset: {assets['create']} to create, {assets['skip']} to "
+        f"skip, {assets['download']} not cached yet (would be downloaded)"
+    )
+    for column, answer in sorted(set(report["unknown"])):
+        lines.append(f"  ! No match for '{answer}' in column '{column}'")
+
+    # Relations and assets are counted, not cleaned, so the import may
+    # still roll back rows listed as valid here
+    lines.append(
+        "Only the fields of new brands and people were validated, not "
+        "their links to each other or their assets."
+    )
+    if report["invalid"]:
+        lines.append(
+            f"Invalid rows: {len(report['invalid'])} (would be rolled back)"
+        )
+    for idx, error in sorted(report["invalid"]):
+        lines.append(f"  ! idx {idx}: {error}")
+    return lines
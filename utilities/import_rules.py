@@ -0,0 +1,327 @@
+from brand.models import Brand, Person
+
+SHARED_RULES = {
+    "Brand": {
+        "pre": {"must": ["name"]},
+        "fields": {
+            # Basic
+            "name": {
+                "type": "text",
+                "source": "Name of Brand",
+            },
+            "title": {
+                "type": "text",
+                "source": "Title of Brand",
+                "default": "UNKNOWN",
+            },
+            "description": {
+                "type": "text",
+                "source": "Brand Info (less than 100 words)",
+                "default": "UNKNOWN",
+            },
+            "founding_year": {
+                "type": "number",
+                "source": "founded_in_year_cleaned",
+                "default": 2020,
+            },
+            "company_size": {
+                "type": "number",
+                "source": "Company Size",
+                "default": 1,
+            },
+            "location": {
+                "type": "enum",
+                "source": "Brand Location",
+                "choices": {
+                    "India": Brand.Location.INDIA,
+                    "International": Brand.Location.INTERNATIONAL,
+                },
+                "default": Brand.Location.INDIA,
+            },
+            # Shopping
+            "offline_presence": {
+                "type": "enum",
+                "source": "Available on offline stores",
+                "choices": {
+                    "Yes": True,
+                    "No": False,
+                },
+                "default": False,
+            },
+            "delivery_days": {
+                "type": "number",
+                "source": "Delivery (in days)",
+                "default": 7,
+            },
+            "return_days": {
+                "type": "number",
+                "source": "Returns ( In days)",
+                "default": 7,
+            },
+            "payment_mode": {
+                "type": "enum",
+                "source": "Payment",
+                "choices": {
+                    "Prepaid": Brand.PaymentMode.PREPAID_ONLY,
+                    "Payment on Delivery": Brand.PaymentMode.BOTH,
+                },
+            },
+            "refund_mode": {
+                "type": "enum",
+                "source": "Refund",
+                "choices": {
+                    "Exchange only": Brand.RefundMode.EXCHANGE_ONLY,
+                    "Not Applicable": Brand.RefundMode.NA,
+                },
+            },
+            # Communication
+            "website": {
+                "type": "url",
+                "source": "Website",
+                "default": "https://thebrandscanner.in",
+            },
+            "phone_number": {
+                "type": "text",
+                "source": "phone_number_cleaned",
+                "default": "UNKNOWN",
+            },
+            "email_address": {
+                "type": "email",
+                "source": "Email Id",
+                "default": "thebrandscanner@gmail.com",
+            },
+            "instagram_profile": {
+                "type": "url",
+                "source": "Instagram url",
+            },
+            "facebook_profile": {
+                "type": "url",
+                "source": "Facebook url",
+            },
+            # Labels
+            "indicative_pricing": {
+                "type": "enum",
+                "source": "indicative_pricing_cleaned",
+                "choices": {
+                    "100": Brand.IndicativePricing.BUDGET_FRIENDLY,
+                    "1000": Brand.IndicativePricing.VALUE,
+                    "10000": Brand.IndicativePricing.LUXURY,
+                },
+            },
+            "made_in_india": {
+                "type": "enum",
+                "source": "Made in India",
+                "choices": {"Yes": True, "No": False},
+                "default": True,
+            },
+            "environment_friendly": {
+                "type": "multiple_choice",
+                "source": "Adhoc Questions",
+                "contains": {
+                    "Sustainable": True,
+                },
+            },
+            "handcrafted": {
+                "type": "multiple_choice",
+                "source": "Adhoc Questions",
+                "contains": {
+                    "Handcrafted": True,
+                },
+            },
+            "customizable": {
+                "type": "multiple_choice",
+                "source": "Adhoc Questions",
+                "contains": {
+                    "Customizable": True,
+                },
+            },
+            "material": {
+                "type": "text",
+                "source": "Material Text",
+                "default": "",
+            },
+        },
+    },
+    "BrandOnlineStore": {
+        "pre": {
+            "foreign": {
+                "accept": ["Brand"],
+                "filter_multiple": {
+                    "OnlineStore": [
+                        {"source": {"name": "Available on online stores"}},
+                    ]
+                },
+            }
+        },
+        "fields": {
+            "brand": {
+                "type": "FK",
+                "model": "Brand",
+            },
+            "online_store": {
+                "type": "FK",
+                "model": "OnlineStore",
+            },
+        },
+    },
+    "Person": {
+        "pre": {
+            "must": ["name"],
+            "image_download": ["photo"],
+        },
+        "fields": {
+            "salutation": {
+                "type": "enum",
+                "source": "Salutation",
+                "choices": {
+                    "Mr.": Person.Salutation.MR,
+                    "Ms.": Person.Salutation.MS,
+                    "Mrs.": Person.Salutation.MRS,
+                    "DR.": Person.Salutation.DR,
+                    "Pt.": Person.Salutation.PT,
+                },
+            },
+            "name": {
+                "type": "text",
+                "source": "Name of Founder",
+            },
+            "photo": {
+                "type": "image",
+                "source": "Photo of Founder (url)",
+            },
+            "background": {
+                "type": "text",
+                "source": "Background of Founder",
+                "default": "",
+            },
+        },
+    },
+    "BrandKeyPerson": {
+        "pre": {
+            "foreign": {
+                "accept": ["Brand", "Person"],
+            }
+        },
+        "fields": {
+            "brand": {"type": "FK", "model": "Brand"},
+            "person": {"type": "FK", "model": "Person"},
+            "designation": {"type": "OVERRIDE", "value": "FR"},
+        },
+    },
+    "BrandAsset": {
+        "pre": {
+            "must": ["asset"],
+            "foreign": {"accept": ["Brand"]},
+            "image_download": ["asset"],
+        },
+        "fields": {
+            "brand": {
+                "type": "FK",
+                "model": "Brand",
+            },
+            "asset": {
+                "type": "image",
+            },
+            "title": {
+                "type": "text",
+            },
+        },
+    },
+    "BrandVisual": {
+        "pre": {
+            "foreign": {
+                "accept": ["Brand"],
+                "create": {
+                    "logo": {
+                        "model": "BrandAsset",
+                        "supply": {
+                            "asset": {"source": "Logo"},
+                            "title": {"static": "Logo"},
+                        },
+                    },
+                    "cover": {
+                        "model": "BrandAsset",
+                        "supply": {
+                            "asset": {"source": "Brand Image"},
+                            "title": {"static": "Cover Image"},
+                        },
+                    },
+                },
+            }
+        },
+        "fields": {
+            "brand": {
+                "type": "FK",
+                "model": "Brand",
+            },
+            "logo": {"type": "FK", "model": "BrandAsset__logo"},
+            "cover": {"type": "FK", "model": "BrandAsset__cover"},
+        },
+    },
+    "BrandCategory": {
+        "pre": {"foreign": {"accept": ["Brand", "Category"]}},
+        "fields": {
+            "brand": {
+                "type": "FK",
+                "model": "Brand",
+            },
+            "category": {"type": "FK", "model": "Category"},
+        },
+    },
+    "BrandTag": {
+        "pre": {
+            "foreign": {
+                "accept": ["Brand", "Category"],
+                "filter_multiple": {
+                    "Tag": [
+                        {
+                            "static": {"name": "identity"},
+                            "source": {"value": "Identity"},
+                            "foreign": {"category": "Category"},
+                        },
+                        {
+                            "static": {"name": "type"},
+                            "source": {"value": "Type"},
+                            "foreign": {"category": "Category"},
+                        },
+                        {
+                            "static": {"name": "material"},
+                            "source": {"value": "Material"},
+                            "foreign": {"category": "Category"},
+                        },
+                        {
+                            "static": {"name": "design"},
+                            "source": {"value": "Design"},
+                            "foreign": {"category": "Category"},
+                        },
+                        {
+                            "static": {"name": "occasion"},
+                            "source": {"value": "Occasion"},
+                            "foreign": {"category": "Category"},
+                        },
+                    ]
+                },
+            },
+            "replace": {
+                "Identity": {
+                    "He/ Him": "Men",
+                    "She/ Her": "Women",
+                },
+                "Type": {
+                    "Heals": "Heels",
+                    "Full Body Dress": "Full body wear",
+                    "Fabric": "Fabrics",
+                },
+            },
+        },
+        "fields": {
+            "brand": {"type": "FK", "model": "Brand"},
+            "tag": {"type": "FK", "model": "Tag"},
+        },
+    },
+}
+
+CATEGORY__RULES = {
+    "clothing": SHARED_RULES,
+    "footwear": SHARED_RULES,
+}
@@ -0,0 +1,111 @@
+from django.core.exceptions import ValidationError
+from django.db import models
+
+from utilities.validators import is_none_or_empty_string
+
+VALIDATION_CHUNK_SIZE = 5000
+MAX_REPORTED_ROWS = 5
+
+
+def _model_plans(import_plan):
+    for plan in import_plan.values():
+        if isinstance(plan, list):
+            yield from plan
+        else:
+            yield plan
+            for _, foreign_plan in plan["create"]:
+                yield foreign_plan
+
+
+def _column_checks(import_plan) -> [dict]:
+    checks = {}
+    for plan in _model_plans(import_plan):
+        converters = dict(plan["fields"])
+        for field_name, column in plan["columns"].items():
+            model_field = plan["model"]._meta.get_field(field_name)
+            if isinstance(model_field, models.FileField):
+                continue
+
+            checks[(plan["model_name"], field_name)] = {
+                "column": column,
+                "must": [column for _, column in plan["must"]],
+                "convert": converters[field_name],
+                "model_field": model_field,
+            }
+    return list(checks.values())
+
+
+def _value_error(check, value):
+    try:
+        converted = check["convert"]({check["column"]: value}, {})
+        check["model_field"].clean(converted, None)
+    except KeyError:
+        return "Unknown choice"
+    except ValidationError as e:
+        return " ".join(e.messages)
+    return None
+
+
+def _check_chunk(checks, chunk, report):
+    for check in checks:
+        column = check["column"]
+        values = [
+            (idx, csv_row.get(column))
+            for idx, csv_row in chunk
+            # Rows without the must values are ignored by the import
+            if not any(
+                is_none_or_empty_string(csv_row.get(must_column))
+                for must_column in check["must"]
+            )
+        ]
+
+        # Each distinct value of the column is checked only once
+        value__error = {
+            value: _value_error(check, value)
+            for value in {value for _, value in values}
+        }
+
+        for idx, value in values:
+            error = value__error[value]
+            if error is None:
+                continue
+
+            column_errors = report.setdefault(column, {})
+            entry = column_errors.setdefault(
+                error, {"count": 0, "rows": [], "values": set()}
+            )
+            entry["count"] += 1
+            if len(entry["rows"]) < MAX_REPORTED_ROWS:
+                entry["rows"].append(idx)
+                entry["values"].add(value)
+
+
+def validate_columns(import_plan, csv_rows, start_idx=0) -> dict:
+    checks = _column_checks(import_plan)
+    report = {}
+
+    chunk = []
+    for idx, csv_row in enumerate(csv_rows, start=start_idx):
+        chunk.append((idx, csv_row))
+        if len(chunk) >= VALIDATION_CHUNK_SIZE:
+            _check_chunk(checks, chunk, report)
+            chunk = []
+    if chunk:
+        _check_chunk(checks, chunk, report)
+
+    return report
+
+
+def validation_report_lines(report) -> [str]:
+    lines = []
+    for column, column_errors in report.items():
+        lines.append(f"Column '{column}':")
+        for error, entry in column_errors.items():
+            rows = ", ".join(str(idx) for idx in entry["rows"])
+            values = ", ".join(
+                repr(value) for value in sorted(entry["values"])
+            )
+            lines.append(
+                f"  {error} ({entry['count']} rows, e.g. idx {rows}: {values})"
+            )
+    return lines
@@ -1,15 +1,17 @@
 import base64
-import copy
-import io
+import binascii
+import functools
+import logging
 import os
 import shutil
+import urllib.parse
+import zlib
 
 import requests
 import urllib3
 from django.apps import apps
 from django.core.exceptions import ValidationError
-from django.core.files import File
-from PIL import Image
+from django.db import DatabaseError
 
 from brand.models import (
     Brand,
@@ -22,31 +24,82 @@ from brand.models import (
     Person,
 )
 from brandscanner.settings.base import BASE_DIR
-from utilities.converters import str_to_md5
+from utilities.converters import file_to_sha256, str_to_md5
+from utilities.image_manifest import ImageManifest
+from utilities.ratelimit import HostRateLimiter
+from utilities.storage import (
+    ContentAddressedStorage,
+    ImportedFile,
+    content_addressed_name,
+    field_file_to_sha256,
+    link_or_copy,
+)
+from utilities.telemetry import IMPORT_TELEMETRY
 from utilities.validators import is_none_or_empty_string
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+logger = logging.getLogger(__name__)
+
 IMAGE_FILE_EXTENSIONS = ["jpg", "png", "webp", "svg"]
+IMAGE_SNIFF_SIZE = 1024
 IMAGE_DOWNLOAD_DIR = f"{BASE_DIR}/tmp/prefill/img"
 SUPPLIED_TAG = "SUPPLIED"
+DOWNLOAD_RATE_LIMITER = HostRateLimiter()
+IMAGE_MANIFEST = ImageManifest(IMAGE_DOWNLOAD_DIR)
+
+VALUE_FIELD_TYPES = ["text", "enum", "number", "email", "url"]
+# multiple_choice fields are described in the rules but not imported yet
+SKIPPED_FIELD_TYPES = ["multiple_choice"]
+
+REMAINING_BRANDASSET_SUPPLY = [
+    {
+        "asset": {"source": "Bestseller pic - url of image"},
+        "title": {"static": "Bestseller"},
+    },
+    {
+        "asset": {"source": "Celebrity endorsement (url of image)"},
+        "title": {"static": "Celebrity Endorsement"},
+    },
+]
+
+# Marks a field that must be left unset on the new model
+_UNSET = object()
+
+
+class ImportRuleError(Exception):
+    pass
+
+
+# Errors that fail a single row. Anything else aborts the current batch.
+ROW_ERRORS = (ValidationError, DatabaseError, KeyError, ValueError)
+
+
+def _brandasset_content_hash(new_model: BrandAsset) -> str:
+    if not new_model.content_hash:
+        new_model.content_hash = field_file_to_sha256(new_model.asset)
+    return new_model.content_hash
+
+
+# Only rows of the same brand and title are the same asset, the storage
+# keeps identical bytes once anyway
+def _existing_brandassets(new_model: BrandAsset):
+    return BrandAsset.objects.filter(
+        brand_id=new_model.brand_id,
+        title=new_model.title,
+        content_hash=_brandasset_content_hash(new_model),
+    )
 
 
 def _check_if_existing_brandasset(new_model: BrandAsset) -> bool:
-    if new_model.asset is not None:
-        filename = (
-            os.path.basename(new_model.asset.url).split(".")[0].split("_")[0]
-        )
-        return BrandAsset.objects.filter(asset__icontains=filename).exists()
+    if new_model.asset:
+        return _existing_brandassets(new_model).exists()
     return False
 
 
 def _get_existing_brandasset(new_model: BrandAsset) -> BrandAsset:
-    if new_model.asset is not None:
-        filename = (
-            os.path.basename(new_model.asset.url).split(".")[0].split("_")[0]
-        )
-        return BrandAsset.objects.get(asset__icontains=filename)
+    if new_model.asset:
+        return _existing_brandassets(new_model).order_by("pk").first()
     return None
 
 
@@ -67,35 +120,371 @@ def _print_model(model_name, model_obj):
             pass
 
 
-def _model_adjusted_csv_src_value(
-    model_field_rules, model_field_type, model_field_name, csv_src_value
-):
-    if is_none_or_empty_string(csv_src_value):
-        default_value = model_field_rules[model_field_name].get(
-            "default", None
+def _text_value(value):
+    return value.strip()
+
+
+def _email_value(value):
+    return value.strip().lower()
+
+
+def _url_value(value):
+    # Remove query params
+    value = value.strip().split("?")[0]
+    # Ensure URL ends with '/'
+    return value if value.endswith("/") else value + "/"
+
+
+def _enum_value(choices, value):
+    return choices[value.strip()]
+
+
+def _column_converter(column, default, transform):
+    def convert(csv_row, foreign):
+        value = csv_row.get(column)
+        if is_none_or_empty_string(value):
+            return value if default is None else default
+        return transform(value)
+
+    return convert
+
+
+def cached_image_path(image_src):
+    return IMAGE_MANIFEST.file_path(str_to_md5(image_src))
+
+
+def cached_image_hash(image_src):
+    if not IMAGE_MANIFEST.has_file(str_to_md5(image_src)):
+        return None
+    return IMAGE_MANIFEST.get(str_to_md5(image_src))["content_hash"]
+
+
+def _image_converter(column):
+    def convert(csv_row, foreign):
+        image_path = cached_image_path(csv_row[column])
+        if image_path is None:
+            return _UNSET
+        # Linked into media storage on save, never opened by the import
+        return ImportedFile(
+            image_path, content_hash=cached_image_hash(csv_row[column])
         )
-        if default_value is not None:
-            csv_src_value = default_value
+
+    return convert
+
+
+def _foreign_converter(foreign_model_name):
+    def convert(csv_row, foreign):
+        # For some optional fields, foreign model could be missing.
+        return foreign.get(foreign_model_name, _UNSET)
+
+    return convert
+
+
+def _static_converter(value):
+    def convert(csv_row, foreign):
+        return value
+
+    return convert
+
+
+def _supplied_field_rule(field_rule, supply_rule):
+    # Expecting only one supply rule per model field name
+    supply_rule_type, supply_rule_value = list(supply_rule.items())[0]
+    if supply_rule_type in ["source"]:
+        return {**field_rule, "source": supply_rule_value}
+    return {"type": "OVERRIDE", "value": supply_rule_value}
+
+
+def _compile_field(model_name, field_name, field_rule, columns, errors):
+    field_type = field_rule.get("type")
+    column = field_rule.get(
+        "source", f"{SUPPLIED_TAG}.{model_name}.{field_name}"
+    )
+
+    if field_type in VALUE_FIELD_TYPES + ["image"] and column not in columns:
+        errors.append(f"{model_name}.{field_name}: no column '{column}'.")
+        return None
+
+    if field_type in ["text", "number"]:
+        transform = _text_value
+    elif field_type in ["email"]:
+        transform = _email_value
+    elif field_type in ["url"]:
+        transform = _url_value
+    elif field_type in ["enum"]:
+        if not isinstance(field_rule.get("choices"), dict):
+            errors.append(f"{model_name}.{field_name}: enum needs choices.")
+            return None
+        transform = functools.partial(_enum_value, field_rule["choices"])
+    elif field_type in ["image"]:
+        return _image_converter(column)
+    elif field_type in ["FK"]:
+        return _foreign_converter(field_rule["model"])
+    elif field_type in ["OVERRIDE"]:
+        return _static_converter(field_rule["value"])
+    elif field_type in SKIPPED_FIELD_TYPES:
+        return None
     else:
-        csv_src_value = csv_src_value.strip()
-
-        if model_field_type in ["enum"]:
-            csv_src_value = model_field_rules[model_field_name]["choices"][
-                csv_src_value
-            ]
-        elif model_field_type in ["email"]:
-            csv_src_value = csv_src_value.lower()
-        elif model_field_type in ["url"]:
-            # Remove query params
-            csv_src_value = csv_src_value.split("?")[0]
-            # Ensure URL ends with '/'
-            csv_src_value = (
-                csv_src_value
-                if csv_src_value.endswith("/")
-                else csv_src_value + "/"
+        errors.append(f"{model_name}.{field_name}: unknown type {field_type}.")
+        return None
+
+    return _column_converter(column, field_rule.get("default"), transform)
+
+
+def _compile_model_plan(
+    model_name, all_model_rules, columns, errors, supply={}
+):
+    model_rules = all_model_rules[model_name]
+    field_rules = {
+        field_name: (
+            _supplied_field_rule(field_rule, supply[field_name])
+            if field_name in supply
+            else field_rule
+        )
+        for field_name, field_rule in model_rules["fields"].items()
+    }
+
+    def field_column(field_name):
+        if field_name not in field_rules:
+            errors.append(f"{model_name}: no rule for field {field_name}.")
+            return None
+        return field_rules[field_name].get(
+            "source", f"{SUPPLIED_TAG}.{model_name}.{field_name}"
+        )
+
+    pre = model_rules["pre"]
+    foreign_rules = pre.get("foreign", {})
+    plan = {
+        "model_name": model_name,
+        "model": apps.get_model("brand", model_name),
+        "must": [
+            (field_name, field_column(field_name))
+            for field_name in pre.get("must", [])
+        ],
+        "accept": foreign_rules.get("accept", []),
+        "image_download": [
+            field_column(field_name)
+            for field_name in pre.get("image_download", [])
+        ],
+        "fields": [],
+        "columns": {},
+        "create": [],
+        "filter_multiple": [],
+    }
+
+    for field_name, field_rule in field_rules.items():
+        converter = _compile_field(
+            model_name, field_name, field_rule, columns, errors
+        )
+        if converter is not None:
+            plan["fields"].append((field_name, converter))
+        if field_rule.get("type") in VALUE_FIELD_TYPES + ["image"]:
+            plan["columns"][field_name] = field_column(field_name)
+
+    for field_name, create_rule in foreign_rules.get("create", {}).items():
+        foreign_plan = _compile_model_plan(
+            create_rule["model"],
+            all_model_rules,
+            columns,
+            errors,
+            supply=create_rule["supply"],
+        )
+        plan["create"].append((field_name, foreign_plan))
+
+    replace = pre.get("replace", {})
+    filter_multiple = foreign_rules.get("filter_multiple", {})
+    for foreign_model_name, filter_rules in filter_multiple.items():
+        for filter_rule in filter_rules:
+            # Expecting only one at a time
+            filter_field_name, column = list(filter_rule["source"].items())[0]
+            if column not in columns:
+                errors.append(f"{model_name}: no column '{column}'.")
+
+            plan["filter_multiple"].append(
+                {
+                    "model_name": foreign_model_name,
+                    "model": apps.get_model("brand", foreign_model_name),
+                    "static": filter_rule.get("static", {}),
+                    "foreign": filter_rule.get("foreign", {}),
+                    "field": filter_field_name,
+                    "column": column,
+                    "replace": replace.get(column, {}),
+                }
             )
 
-    return csv_src_value
+    return plan
+
+
+# Resolves the import rules against the CSV header once, so that each row
+# only runs the compiled converters.
+def compile_import_plan(all_model_rules, csv_header) -> dict:
+    columns = set(csv_header)
+    errors = []
+
+    import_plan = {
+        model_name: _compile_model_plan(
+            model_name, all_model_rules, columns, errors
+        )
+        for model_name in [
+            "Brand",
+            "BrandOnlineStore",
+            "Person",
+            "BrandKeyPerson",
+            "BrandVisual",
+            "BrandCategory",
+            "BrandTag",
+        ]
+    }
+    import_plan["remaining_brandassets"] = [
+        _compile_model_plan(
+            "BrandAsset", all_model_rules, columns, errors, supply=supply
+        )
+        for supply in REMAINING_BRANDASSET_SUPPLY
+    ]
+
+    if errors:
+        raise ImportRuleError("\n".join(errors))
+
+    return import_plan
+
+
+def _plan_columns(plan):
+    yield from (column for _, column in plan["must"])
+    yield from plan["image_download"]
+    yield from plan["columns"].values()
+    for _, foreign_plan in plan["create"]:
+        yield from _plan_columns(foreign_plan)
+    for filter_rule in plan["filter_multiple"]:
+        yield filter_rule["column"]
+
+
+def plan_source_columns(import_plan, csv_header) -> [str]:
+    plans = [
+        plan
+        for model_name, plan in import_plan.items()
+        if model_name != "remaining_brandassets"
+    ]
+    plans.extend(import_plan["remaining_brandassets"])
+
+    columns = set()
+    for plan in plans:
+        columns.update(_plan_columns(plan))
+    # Keeps the sheet's column order and drops SUPPLIED placeholders
+    return [column for column in csv_header if column in columns]
+
+
+def brand_partition(brand_name, partitions) -> int:
+    # Stable across processes, unlike hash()
+    key = brand_name.strip().lower().encode("utf-8")
+    return zlib.crc32(key) % partitions
+
+
+def updatable_fields(plan) -> [str]:
+    # Fields in "must" identify the existing entry, so they are not updated
+    must = [model_field_name for model_field_name, _ in plan["must"]]
+    return [
+        model_field_name
+        for model_field_name in plan["columns"]
+        if model_field_name not in must
+    ]
+
+
+def changed_fields(existing, incoming, field_names) -> [str]:
+    changed = []
+    for field_name in field_names:
+        field = existing._meta.get_field(field_name)
+        incoming_value = field.to_python(getattr(incoming, field_name))
+        if incoming_value != getattr(existing, field_name):
+            changed.append(field_name)
+    return changed
+
+
+def _image_url_extension(image_url) -> str:
+    # Remove all query params.
+    # Assuming image url will end with image file ext.
+    image_url = image_url.split("?")[0]
+
+    if image_url.endswith(".jpg") or image_url.endswith(".jpeg"):
+        return "jpg"
+    if image_url.endswith(".png"):
+        return "png"
+    elif image_url.endswith(".webp"):
+        return "webp"
+    elif image_url.endswith(".svg"):
+        return "svg"
+    return "jpg"
+
+
+def _sniff_image_extension(head):
+    if head.startswith(b"\xff\xd8\xff"):
+        return "jpg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+
+    text = head[:IMAGE_SNIFF_SIZE].lstrip(b"\xef\xbb\xbf \t\r\n").lower()
+    if text.startswith(b"<svg"):
+        return "svg"
+    if text.startswith((b"<?xml", b"<!doctype svg", b"<!--")):
+        if b"<svg" in text:
+            return "svg"
+    return None
+
+
+def _data_uri_bytes(image_url):
+    # data:[<media type>][;base64],<data>
+    header, separator, data = image_url.partition(",")
+    if not separator:
+        return None
+
+    if header.endswith(";base64"):
+        try:
+            return base64.b64decode(data)
+        except binascii.Error:
+            return None
+    return urllib.parse.unquote_to_bytes(data)
+
+
+def _restore_image(md5_name, entry) -> bool:
+    # The image directory may have been wiped while the same bytes are
+    # still stored as a brand asset
+    if not entry["content_hash"]:
+        return False
+
+    extension = os.path.splitext(entry["file_name"])[1]
+    asset_name = content_addressed_name(entry["content_hash"], extension)
+    asset_path = ContentAddressedStorage().path(asset_name)
+    if not os.path.exists(asset_path):
+        return False
+
+    image_path = IMAGE_MANIFEST.image_path(entry["file_name"])
+    try:
+        link_or_copy(asset_path, image_path)
+    except FileExistsError:
+        # Restored by a parallel importer
+        pass
+    IMAGE_MANIFEST.record(md5_name, **_entry_fields(entry))
+    IMPORT_TELEMETRY.count("images restored")
+    return True
+
+
+def _entry_fields(entry) -> dict:
+    return {
+        "file_name": entry["file_name"],
+        "content_hash": entry["content_hash"],
+        "etag": entry["etag"],
+        "last_modified": entry["last_modified"],
+    }
+
+
+def _conditional_headers(entry) -> dict:
+    headers = {}
+    if entry["etag"]:
+        headers["If-None-Match"] = entry["etag"]
+    if entry["last_modified"]:
+        headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
 
 
 def _download_image(image_url) -> bool:
@@ -103,193 +492,208 @@ def _download_image(image_url) -> bool:
         return False
 
     md5_name = str_to_md5(image_url)
-    for ext in IMAGE_FILE_EXTENSIONS:
-        if os.path.exists(f"{IMAGE_DOWNLOAD_DIR}/{md5_name}.{ext}"):
-            print("Image alredy exists. Skipping download.")
+    entry = IMAGE_MANIFEST.get(md5_name)
+    is_data_uri = image_url.startswith("data:")
+    if IMAGE_MANIFEST.has_file(md5_name):
+        # Data URIs can not change, urls are revalidated on refresh runs
+        if (
+            is_data_uri
+            or not IMAGE_MANIFEST.refresh
+            or IMAGE_MANIFEST.is_fresh(md5_name)
+        ):
+            logger.debug("Image alredy exists. Skipping download.")
+            IMPORT_TELEMETRY.count("images cached")
             return True
-
-    jpg_b64_prefix = "data:image/jpeg;base64,"
-    png_b64_prefix = "data:image/png;base64,"
-    if image_url.startswith(jpg_b64_prefix):
-        prefix_len = len(jpg_b64_prefix)
-        image_b64 = image_url[prefix_len:]
-        Image.open(io.BytesIO(base64.b64decode(image_b64))).save(
-            f"{IMAGE_DOWNLOAD_DIR}/{md5_name}.jpg"
-        )
-    elif image_url.startswith(png_b64_prefix):
-        prefix_len = len(png_b64_prefix)
-        image_b64 = image_url[prefix_len:]
-        Image.open(io.BytesIO(base64.b64decode(image_b64))).save(
-            f"{IMAGE_DOWNLOAD_DIR}/{md5_name}.png"
-        )
-    else:
-        # Remove all query params.
-        # Assuming image url will end with image file ext.
-
-        image_url = image_url.split("?")[0]
-        image_ext = None
-
-        if image_url.endswith(".jpg") or image_url.endswith(".jpeg"):
-            image_ext = "jpg"
-        if image_url.endswith(".png"):
-            image_ext = "png"
-        elif image_url.endswith(".webp"):
-            image_ext = "webp"
-        elif image_url.endswith(".svg"):
-            image_ext = "svg"
-        else:
-            image_ext = "jpg"
-
-        resp = requests.get(image_url, stream=True, verify=False)
-        if resp.status_code != 200:
-            del resp
-            print("Non OK return code while downloading image.")
+    elif entry is not None and _restore_image(md5_name, entry):
+        return True
+
+    etag = last_modified = None
+    if is_data_uri:
+        # The decoded bytes are the image, written as is without PIL
+        with IMPORT_TELEMETRY.stage("decode"):
+            image_bytes = _data_uri_bytes(image_url)
+        image_ext = _sniff_image_extension(image_bytes or b"")
+        if image_ext is None:
+            logger.debug("Unsupported data URI image.")
             return False
 
-        with open(f"{IMAGE_DOWNLOAD_DIR}/{md5_name}.{image_ext}", "wb") as f:
-            resp.raw.decode_content = True
-            shutil.copyfileobj(resp.raw, f)
+        image_path = IMAGE_MANIFEST.image_path(f"{md5_name}.{image_ext}")
+        part_path = f"{image_path}.{os.getpid()}.part"
+        with open(part_path, "wb") as f:
+            f.write(image_bytes)
+        os.replace(part_path, image_path)
+        IMPORT_TELEMETRY.count("images decoded")
+    else:
+        image_ext = _image_url_extension(image_url)
+        headers = {}
+        if IMAGE_MANIFEST.has_file(md5_name):
+            headers = _conditional_headers(entry)
+
+        # Only real network fetches are throttled
+        with DOWNLOAD_RATE_LIMITER.limit(image_url):
+            resp = requests.get(
+                image_url.split("?")[0],
+                headers=headers,
+                stream=True,
+                verify=False,
+            )
+            if resp.status_code == 304:
+                del resp
+                IMAGE_MANIFEST.mark_fresh(md5_name)
+                IMPORT_TELEMETRY.count("images not modified")
+                return True
+
+            if resp.status_code != 200:
+                del resp
+                logger.debug("Non OK return code while downloading image.")
+                # A stale copy is better than none
+                return IMAGE_MANIFEST.has_file(md5_name)
+
+            # Renamed into place so parallel importers never read a
+            # partially written image
+            part_path = IMAGE_MANIFEST.image_path(
+                f"{md5_name}.{os.getpid()}.part"
+            )
+            with open(part_path, "wb") as f:
+                resp.raw.decode_content = True
+                shutil.copyfileobj(resp.raw, f)
+            with open(part_path, "rb") as f:
+                image_ext = (
+                    _sniff_image_extension(f.read(IMAGE_SNIFF_SIZE))
+                    or image_ext
+                )
+            image_path = IMAGE_MANIFEST.image_path(f"{md5_name}.{image_ext}")
+            os.replace(part_path, image_path)
+            etag = resp.headers.get("ETag")
+            last_modified = resp.headers.get("Last-Modified")
 
         del resp
-
+        IMPORT_TELEMETRY.count("images downloaded")
+        IMPORT_TELEMETRY.count("bytes downloaded", os.path.getsize(image_path))
+
+    with open(image_path, "rb") as f:
+        content_hash = file_to_sha256(f)
+
+    IMAGE_MANIFEST.record(
+        md5_name,
+        os.path.basename(image_path),
+        content_hash,
+        etag,
+        last_modified,
+    )
     return True
 
 
-def _run_pre_checks(model_name, model_rules, csv_row, foreign) -> bool:
-    must = model_rules["pre"].get("must", [])
-    model_field_rules = model_rules["fields"]
-
-    for model_field_name in must:
-        csv_src_col_name = model_field_rules[model_field_name].get(
-            "source", f"{SUPPLIED_TAG}.{model_name}.{model_field_name}"
-        )
+def _run_pre_checks(plan, csv_row, foreign, download_images=True) -> bool:
+    for model_field_name, csv_src_col_name in plan["must"]:
         csv_src_value = csv_row.get(csv_src_col_name)
 
         if is_none_or_empty_string(csv_src_value):
-            print(f"Value for field {model_field_name} not found.")
+            logger.debug("Value for field %s not found.", model_field_name)
             return True
 
-    accept = model_rules["pre"].get("foreign", {}).get("accept", [])
-    for foreign_model_name in accept:
+    for foreign_model_name in plan["accept"]:
         if foreign_model_name not in foreign:
-            print(f"Foreign model {foreign_model_name} not found.")
+            logger.debug("Foreign model %s not found.", foreign_model_name)
             return True
 
-    image_download = model_rules["pre"].get("image_download", [])
-    for model_field_name in image_download:
-        image_src_col_name = model_field_rules[model_field_name].get(
-            "source", f"{SUPPLIED_TAG}.{model_name}.{model_field_name}"
-        )
+    if not download_images:
+        return False
 
-        image_src = csv_row.get(image_src_col_name, None)
+    for image_src_col_name in plan["image_download"]:
+        # Not returning err True for image download failure.
+        _download_row_image(csv_row, image_src_col_name)
+
+    return False
+
+
+def _download_row_image(csv_row, image_src_col_name):
+    image_src = csv_row.get(image_src_col_name, None)
+    with IMPORT_TELEMETRY.stage("download"):
         success = _download_image(image_src)
 
-        if not success:
-            # Not returning err True for image download failure.
-            print(f"Could not download image from path '{image_src}'.")
+    if not success:
+        IMPORT_TELEMETRY.count("image download failures")
+        logger.debug("Could not download image from path '%s'.", image_src)
 
-    return False
 
+def _all_plans(import_plan):
+    for model_plans in import_plan.values():
+        if not isinstance(model_plans, list):
+            model_plans = [model_plans]
+        for plan in model_plans:
+            yield plan
+            yield from (foreign_plan for _, foreign_plan in plan["create"])
 
-def _import_as_model(model_name, model_rules, csv_row, foreign={}):
-    err = _run_pre_checks(model_name, model_rules, csv_row, foreign)
-    if err:
-        return None
 
-    model_field_rules = model_rules["fields"]
-    model = apps.get_model("brand", model_name)()
+def _has_must_values(plan, csv_row) -> bool:
+    return not any(
+        is_none_or_empty_string(csv_row.get(column))
+        for _, column in plan["must"]
+    )
 
-    for model_field_name in model_field_rules:
-        model_field_type = model_field_rules[model_field_name]["type"]
 
-        if model_field_type in ["text", "enum", "number", "email", "url"]:
-            csv_src_col_name = model_field_rules[model_field_name].get(
-                "source", f"{SUPPLIED_TAG}.{model_name}.{model_field_name}"
-            )
-            csv_src_value = _model_adjusted_csv_src_value(
-                model_field_rules,
-                model_field_type,
-                model_field_name,
-                csv_row.get(csv_src_col_name),
-            )
-            setattr(model, model_field_name, csv_src_value)
+def download_row_images(import_plan, csv_row):
+    """
+    Downloads the images the pre-checks of import_plan would download
+    for csv_row. Network errors are raised.
+    """
+    if not _has_must_values(import_plan["Brand"], csv_row):
+        return
+
+    for plan in _all_plans(import_plan):
+        if not _has_must_values(plan, csv_row):
+            continue
+        for image_src_col_name in plan["image_download"]:
+            _download_row_image(csv_row, image_src_col_name)
+
+
+def without_image_downloads(import_plan) -> dict:
+    """
+    Copy of import_plan whose pre-checks download nothing, for rows whose
+    images download_row_images already fetched.
+    """
+
+    def strip(plan):
+        return {
+            **plan,
+            "image_download": [],
+            "create": [
+                (field_name, strip(foreign_plan))
+                for field_name, foreign_plan in plan["create"]
+            ],
+        }
+
+    return {
+        model_name: (
+            [strip(p) for p in plan] if isinstance(plan, list) else strip(plan)
+        )
+        for model_name, plan in import_plan.items()
+    }
 
-        elif model_field_type in ["image"]:
-            image_src_col_name = model_field_rules[model_field_name].get(
-                "source", f"{SUPPLIED_TAG}.{model_name}.{model_field_name}"
-            )
-            image_src = csv_row[image_src_col_name]
-            md5_name = str_to_md5(image_src)
-
-            for extension in IMAGE_FILE_EXTENSIONS:
-                if os.path.exists(
-                    f"{IMAGE_DOWNLOAD_DIR}/{md5_name}.{extension}"
-                ):
-                    file_obj = File(
-                        open(
-                            f"{IMAGE_DOWNLOAD_DIR}/{md5_name}.{extension}",
-                            "rb",
-                        ),
-                        name=f"{md5_name}.{extension}",
-                    )
-                    setattr(model, model_field_name, file_obj)
-                    break
-
-        elif model_field_type in ["FK"]:
-            foreign_model_name = model_field_rules[model_field_name]["model"]
-            try:
-                setattr(model, model_field_name, foreign[foreign_model_name])
-            except KeyError:
-                # For some optional fields, foreign model could be missing.
-                pass
-
-        elif model_field_type in ["OVERRIDE"]:
-            setattr(
-                model,
-                model_field_name,
-                model_field_rules[model_field_name]["value"],
-            )
 
-    return model
+def _import_as_model(plan, csv_row, foreign={}, download_images=True):
+    err = _run_pre_checks(plan, csv_row, foreign, download_images)
+    if err:
+        return None
 
+    field_values = {}
+    for model_field_name, convert in plan["fields"]:
+        value = convert(csv_row, foreign)
+        if value is not _UNSET:
+            field_values[model_field_name] = value
 
-def _create_foreign_and_import_as_model(
-    model_name, all_model_rules, csv_row, foreign
-):
-    err = _run_pre_checks(
-        model_name, all_model_rules[model_name], csv_row, foreign
-    )
+    return plan["model"](**field_values)
+
+
+def _create_foreign_and_import_as_model(plan, csv_row, foreign):
+    err = _run_pre_checks(plan, csv_row, foreign)
     if err:
         return None
 
-    foreign__create = all_model_rules[model_name]["pre"]["foreign"]["create"]
-    for model_field_name in foreign__create:
-        foreign_model_name = foreign__create[model_field_name]["model"]
-
-        for (
-            foreign_model_field_name,
-            foreign_model_field_supply_rule,
-        ) in foreign__create[model_field_name]["supply"].items():
-            # Expecting only one foreign model field supply rule
-            # per foreign model field name
-            supply_rule_type, supply_rule_value = list(
-                foreign_model_field_supply_rule.items()
-            )[0]
-            if supply_rule_type in ["source"]:
-                csv_row[
-                    f"{SUPPLIED_TAG}.{foreign_model_name}.{foreign_model_field_name}"  # noqa: E501
-                ] = csv_row[supply_rule_value]
-            elif supply_rule_type in ["static"]:
-                csv_row[
-                    f"{SUPPLIED_TAG}.{foreign_model_name}.{foreign_model_field_name}"  # noqa: E501
-                ] = supply_rule_value
-
-        foreign_model = _import_as_model(
-            foreign_model_name,
-            all_model_rules[foreign_model_name],
-            csv_row,
-            foreign,
-        )
+    for model_field_name, foreign_plan in plan["create"]:
+        foreign_model_name = foreign_plan["model_name"]
+        foreign_model = _import_as_model(foreign_plan, csv_row, foreign)
         if foreign_model is not None:
             ignore_foreign_model = False
             try:
@@ -317,149 +721,88 @@ def _create_foreign_and_import_as_model(
                         f"{foreign_model_name}__{model_field_name}"
                     ] = existing_foreign_model
 
-    return _import_as_model(
-        model_name, all_model_rules[model_name], csv_row, foreign
-    )
+    return _import_as_model(plan, csv_row, foreign)
 
 
-def _filter_foreign_and_import_as_model(
-    model_name, model_rules, csv_row, foreign
-):
-    err = _run_pre_checks(model_name, model_rules, csv_row, foreign)
+def _filter_foreign_and_import_as_model(plan, csv_row, foreign):
+    err = _run_pre_checks(plan, csv_row, foreign)
     if err:
         return []
 
     models = []
-    foreign__filter_multiple = model_rules["pre"]["foreign"]["filter_multiple"]
 
-    for foreign_model_name in foreign__filter_multiple:
-        filters = foreign__filter_multiple[foreign_model_name]
-        filter_kwargs = {}
-
-        for filter_rule in filters:
-            for filter_field_name, static_value in list(
-                filter_rule.get("static", {}).items()
-            ):
-                filter_kwargs[f"{filter_field_name}"] = static_value
-
-            for filter_field_name, _foreign_model_name in list(
-                filter_rule.get("foreign", {}).items()
-            ):
-                filter_kwargs[f"{filter_field_name}"] = foreign[
-                    _foreign_model_name
-                ]
+    for filter_plan in plan["filter_multiple"]:
+        filter_kwargs = dict(filter_plan["static"])
+        for filter_field_name, _foreign_model_name in filter_plan[
+            "foreign"
+        ].items():
+            filter_kwargs[filter_field_name] = foreign[_foreign_model_name]
+
+        multiple_choice_answers = csv_row[filter_plan["column"]].split(",")
+        for answer in multiple_choice_answers:
+            answer = answer.strip()
+            answer = filter_plan["replace"].get(answer, answer)
+
+            filter_kwargs[filter_plan["field"]] = answer
+            foreign_model_objs = filter_plan["model"].objects.filter(
+                **filter_kwargs
+            )
 
-            # Expecting only one at a time
-            filter_field_name, csv_src_col_name = list(
-                filter_rule.get("source", {}).items()
-            )[0]
-            multiple_choice_answers = csv_row[csv_src_col_name].split(",")
-            for answer in multiple_choice_answers:
-                answer = answer.strip()
-
-                if csv_src_col_name in model_rules["pre"].get("replace", {}):
-                    answer = model_rules["pre"]["replace"][
-                        csv_src_col_name
-                    ].get(answer, answer)
-
-                filter_kwargs[f"{filter_field_name}"] = answer
-                # print(filter_kwargs)
-                foreign_model = apps.get_model("brand", foreign_model_name)
-                foreign_model_objs = foreign_model.objects.filter(
-                    **filter_kwargs
+            if len(foreign_model_objs) == 0:
+                logger.debug(
+                    "No foreign objects found for filter %s", filter_kwargs
                 )
 
-                if foreign_model_objs.count() == 0:
-                    print(
-                        f"No foreign objects found for filter {filter_kwargs}"
-                    )
-
-                for foreign_model_obj in foreign_model_objs:
-                    model = _import_as_model(
-                        model_name,
-                        model_rules,
-                        csv_row,
-                        foreign={
-                            **foreign,
-                            foreign_model_name: foreign_model_obj,
-                        },
-                    )
-                    if model is not None:
-                        models.append(model)
+            for foreign_model_obj in foreign_model_objs:
+                model = _import_as_model(
+                    plan,
+                    csv_row,
+                    foreign={
+                        **foreign,
+                        filter_plan["model_name"]: foreign_model_obj,
+                    },
+                )
+                if model is not None:
+                    models.append(model)
 
     return models
 
 
-def import_as_brand(all_model_rules, csv_row) -> Brand:
-    return _import_as_model("Brand", all_model_rules["Brand"], csv_row)
+def import_as_brand(import_plan, csv_row) -> Brand:
+    return _import_as_model(import_plan["Brand"], csv_row)
 
 
 def import_as_brandonlinestore(
-    all_model_rules, csv_row, foreign
+    import_plan, csv_row, foreign
 ) -> [BrandOnlineStore]:
     return _filter_foreign_and_import_as_model(
-        "BrandOnlineStore",
-        all_model_rules["BrandOnlineStore"],
-        csv_row,
-        foreign,
+        import_plan["BrandOnlineStore"], csv_row, foreign
     )
 
 
-def import_as_person(all_model_rules, csv_row) -> Person:
-    return _import_as_model("Person", all_model_rules["Person"], csv_row)
-
-
-def import_as_brandkeyperson(
-    all_model_rules, csv_row, foreign
-) -> BrandKeyPerson:
+def import_as_person(import_plan, csv_row, download_images=True) -> Person:
     return _import_as_model(
-        "BrandKeyPerson", all_model_rules["BrandKeyPerson"], csv_row, foreign
+        import_plan["Person"], csv_row, download_images=download_images
     )
 
 
-def import_as_brandvisual(all_model_rules, csv_row, foreign) -> BrandVisual:
+def import_as_brandkeyperson(import_plan, csv_row, foreign) -> BrandKeyPerson:
+    return _import_as_model(import_plan["BrandKeyPerson"], csv_row, foreign)
+
+
+def import_as_brandvisual(import_plan, csv_row, foreign) -> BrandVisual:
     return _create_foreign_and_import_as_model(
-        "BrandVisual", all_model_rules, csv_row, foreign
+        import_plan["BrandVisual"], csv_row, foreign
     )
 
 
 def import_remaining_brandassets(
-    all_model_rules, csv_row, foreign
+    import_plan, csv_row, foreign
 ) -> [BrandAsset]:
-    supply = [
-        {
-            "asset": {"source": "Bestseller pic - url of image"},
-            "title": {"static": "Bestseller"},
-        },
-        {
-            "asset": {"source": "Celebrity endorsement (url of image)"},
-            "title": {"static": "Celebrity Endorsement"},
-        },
-    ]
-
     models = []
 
-    for supply_rule in supply:
-        # Do not edit the orignal rules dict
-        model_rules = copy.deepcopy(all_model_rules["BrandAsset"])
-        for model_field_name, model_field_supply_rule in supply_rule.items():
-            # Expecting only one model field supply rule
-            # per model field name
-            supply_rule_type, supply_rule_value = list(
-                model_field_supply_rule.items()
-            )[0]
-
-            if supply_rule_type in ["source"]:
-                model_rules["fields"][model_field_name][
-                    "source"
-                ] = supply_rule_value
-            elif supply_rule_type in ["static"]:
-                model_rules["fields"][model_field_name]["type"] = "OVERRIDE"
-                model_rules["fields"][model_field_name][
-                    "value"
-                ] = supply_rule_value
-
-        model = _import_as_model("BrandAsset", model_rules, csv_row, foreign)
+    for plan in import_plan["remaining_brandassets"]:
+        model = _import_as_model(plan, csv_row, foreign)
         if model is not None:
             ignore_model = False
             try:
@@ -476,15 +819,11 @@ def import_remaining_brandassets(
     return models
 
 
-def import_as_brandcategory(
-    all_model_rules, csv_row, foreign
-) -> BrandCategory:
-    return _import_as_model(
-        "BrandCategory", all_model_rules["BrandCategory"], csv_row, foreign
-    )
+def import_as_brandcategory(import_plan, csv_row, foreign) -> BrandCategory:
+    return _import_as_model(import_plan["BrandCategory"], csv_row, foreign)
 
 
-def import_as_brandtag(all_model_rules, csv_row, foreign) -> [BrandTag]:
+def import_as_brandtag(import_plan, csv_row, foreign) -> [BrandTag]:
     return _filter_foreign_and_import_as_model(
-        "BrandTag", all_model_rules["BrandTag"], csv_row, foreign
+        import_plan["BrandTag"], csv_row, foreign
     )
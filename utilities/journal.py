@@ -0,0 +1,71 @@
+import json
+import os
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+
+from utilities.converters import file_to_sha256
+from utilities.dates import current_india_time
+
+JOURNAL_FILE_NAME = "import_journal.jsonl"
+
+
+def journal_path() -> Path:
+    return Path(settings.DATA_ROOT) / JOURNAL_FILE_NAME
+
+
+def file_fingerprint(file_path) -> str:
+    with open(file_path, "rb") as f:
+        return file_to_sha256(f)
+
+
+def new_run_id() -> str:
+    return uuid.uuid4().hex
+
+
+def last_committed_row(category_name, fingerprint, partition=None):
+    path = journal_path()
+    if not path.exists():
+        return None
+
+    last_row = None
+    with open(path, encoding="utf-8") as journal:
+        for line in journal:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # Partially written entry from a crashed run
+                continue
+
+            if (
+                entry.get("category") == category_name
+                and entry.get("fingerprint") == fingerprint
+                and entry.get("partition") == partition
+            ):
+                last_row = entry["row"]
+
+    return last_row
+
+
+def open_journal():
+    path = journal_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return open(path, "a", encoding="utf-8")
+
+
+def record_checkpoint(
+    journal, run_id, category_name, fingerprint, row, partition=None
+):
+    entry = {
+        "run": run_id,
+        "category": category_name,
+        "fingerprint": fingerprint,
+        "partition": partition,
+        "row": row,
+        "at": current_india_time().isoformat(),
+    }
+    # One write per line keeps appends from parallel workers whole
+    journal.write(json.dumps(entry) + "\n")
+    journal.flush()
+    os.fsync(journal.fileno())
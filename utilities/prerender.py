@@ -0,0 +1,161 @@
+import hashlib
+import inspect
+import json
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.db import connections
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+
+from brand.models import Brand, Category
+
+STAMPS_FILE_NAME = "prerender_stamps.json"
+PAGE_FILE_NAME = "index.html"
+
+
+def stamps_path() -> Path:
+    return Path(settings.DATA_ROOT) / STAMPS_FILE_NAME
+
+
+def load_stamps() -> dict:
+    path = stamps_path()
+    if not path.exists():
+        return {}
+    with open(path, encoding="utf-8") as stamps_file:
+        return json.load(stamps_file)
+
+
+def save_stamps(stamps):
+    path = stamps_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_name(f".{uuid.uuid4().hex}.{path.name}")
+    with open(temp_path, "w", encoding="utf-8") as stamps_file:
+        json.dump(stamps, stamps_file, indent=1, sort_keys=True)
+    os.replace(temp_path, path)
+
+
+def page_file_name(url_path) -> str:
+    """
+    File of a page relative to WEB_ROOT. /brands/clothing/ is stored as
+    brands/clothing/index.html, which the web server serves for the bare
+    path. Filtered listings have a query string and are not prerendered.
+    """
+    directory = url_path.strip("/")
+    return f"{directory}/{PAGE_FILE_NAME}" if directory else PAGE_FILE_NAME
+
+
+def listing_pages(category) -> [str]:
+    return [reverse("brand:brand_listing", args=[category.internal_name])]
+
+
+def detail_pages(brand_ids) -> [str]:
+    return [
+        reverse("brand:brand_detail", args=[brand_id])
+        for brand_id in brand_ids
+    ]
+
+
+def affected_pages(category_names=None, brand_ids=None) -> [str]:
+    """
+    Pages to render. Everything by default, otherwise the listing pages
+    of the given categories and of the categories of the given brands,
+    and the detail pages of those brands.
+    """
+    categories = Category.objects.order_by("pk")
+    brands = Brand.objects.filter(is_active=True).order_by("pk")
+    if category_names or brand_ids:
+        categories = categories.filter(
+            internal_name__in=category_names or []
+        ) | categories.filter(brandcategory__brand_id__in=brand_ids or [])
+        brands = brands.filter(pk__in=brand_ids or [])
+
+    pages = []
+    for category in categories.distinct():
+        pages.extend(listing_pages(category))
+    pages.extend(detail_pages(brands.values_list("pk", flat=True)))
+    return pages
+
+
+def render_page(request_factory, url_path):
+    request = request_factory.get(url_path)
+    request.user = AnonymousUser()
+    match = resolve(url_path)
+    # The page cache may hold stale pages and replicas may lag right after
+    # an import, so the bare view reads from the primary
+    view = inspect.unwrap(match.func)
+    response = view(request, *match.args, **match.kwargs)
+    if hasattr(response, "render"):
+        response.render()
+    return response
+
+
+def _write_page(file_name, content):
+    path = Path(settings.WEB_ROOT) / file_name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # The web server may read the page while it is replaced
+    temp_path = path.with_name(f".{uuid.uuid4().hex}.{path.name}")
+    with open(temp_path, "wb") as page_file:
+        page_file.write(content)
+    os.replace(temp_path, path)
+
+
+def _render_pages(pages, stamps):
+    request_factory = RequestFactory()
+    results = []
+    try:
+        for url_path in pages:
+            file_name = page_file_name(url_path)
+            response = render_page(request_factory, url_path)
+            if response.status_code != 200:
+                results.append((file_name, None, "failed"))
+                continue
+
+            stamp = hashlib.sha256(response.content).hexdigest()
+            if stamps.get(file_name) == stamp and os.path.exists(
+                Path(settings.WEB_ROOT) / file_name
+            ):
+                results.append((file_name, stamp, "unchanged"))
+                continue
+
+            _write_page(file_name, response.content)
+            results.append((file_name, stamp, "written"))
+    finally:
+        # Each worker thread has its own connections
+        connections.close_all()
+    return results
+
+
+def prerender(pages, workers, stamps, prune=False):
+    """
+    Renders pages in worker threads and writes those whose HTML changed
+    since the stamps were taken. With prune, pages in stamps that are
+    not in pages any more are deleted. Returns the new stamps and the
+    file names by outcome.
+    """
+    new_stamps = {} if prune else dict(stamps)
+    outcomes = {"written": [], "unchanged": [], "failed": [], "removed": []}
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(_render_pages, pages[worker_idx::workers], stamps)
+            for worker_idx in range(workers)
+        ]
+        for future in futures:
+            for file_name, stamp, outcome in future.result():
+                outcomes[outcome].append(file_name)
+                if stamp is not None:
+                    new_stamps[file_name] = stamp
+
+    if prune:
+        for file_name in sorted(set(stamps) - set(new_stamps)):
+            path = Path(settings.WEB_ROOT) / file_name
+            if path.exists():
+                path.unlink()
+            outcomes["removed"].append(file_name)
+
+    return new_stamps, outcomes
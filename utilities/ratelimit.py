@@ -0,0 +1,62 @@
+import contextlib
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+class TokenBucket:
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.tokens = self.burst
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.burst,
+                    self.tokens + (now - self.updated_at) * self.rate,
+                )
+                self.updated_at = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_secs = (1 - self.tokens) / self.rate
+
+            time.sleep(wait_secs)
+
+
+class HostRateLimiter:
+    """
+    Limits requests per second per host. A rate of 0 means unlimited.
+    """
+
+    def __init__(self, rate=0, burst=1):
+        self.configure(rate, burst)
+
+    def configure(self, rate=0, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.host__bucket = {}
+        self.lock = threading.Lock()
+
+    def _host_bucket(self, host):
+        with self.lock:
+            if host not in self.host__bucket:
+                self.host__bucket[host] = (
+                    TokenBucket(self.rate, self.burst)
+                    if self.rate > 0
+                    else None
+                )
+            return self.host__bucket[host]
+
+    @contextlib.contextmanager
+    def limit(self, url):
+        bucket = self._host_bucket(urlsplit(url).hostname)
+        if bucket is not None:
+            bucket.acquire()
+        yield
@@ -0,0 +1,54 @@
+import contextlib
+import csv
+import functools
+
+from utilities.columnar import (
+    columnar_format,
+    columnar_header,
+    columnar_row_count,
+    columnar_to_dict_iter,
+    open_columnar,
+)
+from utilities.converters import csv_header, csv_to_dict_iter
+from utilities.validators import is_csv_file
+
+
+def _columnar_rows(reader, start=0, count=0, columns=None):
+    return columnar_to_dict_iter(reader, columns, start, count)
+
+
+def _csv_rows(csv_file, start=0, count=0, columns=None):
+    # DictReader parses every column anyway
+    return csv_to_dict_iter(csv_file, start, count)
+
+
+@contextlib.contextmanager
+def open_sheet(sheet_path):
+    """
+    Yields the header of a CSV, Parquet or Arrow sheet and a function
+    rows(start=0, count=0, columns=None) that streams its rows as dicts.
+    """
+    sheet_format = columnar_format(sheet_path)
+    if sheet_format is not None:
+        reader = open_columnar(sheet_path, sheet_format)
+        yield columnar_header(reader), functools.partial(
+            _columnar_rows, reader
+        )
+        return
+
+    # One file handle is shared by the sniffer and the reader
+    with open(sheet_path, encoding="utf-8", newline="") as csv_file:
+        if not is_csv_file(csv_file):
+            print(f"{sheet_path} is not a CSV file.")
+
+        yield csv_header(csv_file), functools.partial(_csv_rows, csv_file)
+
+
+def sheet_row_count(sheet_path) -> int:
+    sheet_format = columnar_format(sheet_path)
+    if sheet_format is not None:
+        return columnar_row_count(open_columnar(sheet_path, sheet_format))
+
+    # Raw rows are counted without building dicts
+    with open(sheet_path, encoding="utf-8", newline="") as csv_file:
+        return max(sum(1 for row in csv.reader(csv_file) if row) - 1, 0)
@@ -0,0 +1,176 @@
+import os
+import shutil
+import uuid
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+from utilities.converters import file_to_sha256
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+CONTENT_HASH_PREFIX_LEN = 2
+# _IOW(0x94, 9, int) from linux/fs.h
+FICLONE = 0x40049409
+
+
+def link_or_copy(source_path, dest_path):
+    """
+    Places source_path at dest_path without streaming it through Python:
+    a hardlink, else a reflink on filesystems that support it, else a
+    kernel side copy. Raises FileExistsError if dest_path exists.
+    """
+    try:
+        os.link(source_path, dest_path)
+        return
+    except FileExistsError:
+        raise
+    except OSError:
+        # Different filesystem, or one without hardlinks
+        pass
+
+    with open(source_path, "rb") as src, open(dest_path, "xb") as dst:
+        if fcntl is not None:
+            try:
+                fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+                return
+            except OSError:
+                pass
+    shutil.copyfile(source_path, dest_path)
+
+
+class ImportedFile(File):
+    """
+    A file that already exists on local disk, like an image from the
+    import cache. It is only opened when read; storages that know about
+    it link source_path in place instead.
+    """
+
+    def __init__(self, source_path, name=None, content_hash=None):
+        super().__init__(None, name=name or os.path.basename(source_path))
+        self.source_path = source_path
+        self.content_hash = content_hash
+
+    @property
+    def file(self):
+        if self._file is None:
+            self._file = open(self.source_path, "rb")
+        return self._file
+
+    @file.setter
+    def file(self, file):
+        self._file = file
+
+    @property
+    def size(self):
+        return os.path.getsize(self.source_path)
+
+    @property
+    def closed(self):
+        return self._file is None or self._file.closed
+
+    def open(self, mode="rb"):
+        self.close()
+        self._file = open(self.source_path, mode)
+        return self
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def sha256(self) -> str:
+        if self.content_hash is None:
+            with open(self.source_path, "rb") as f:
+                self.content_hash = file_to_sha256(f)
+        return self.content_hash
+
+
+def content_addressed_name(content_hash, extension):
+    return (
+        f"assets/{content_hash[:CONTENT_HASH_PREFIX_LEN]}/"
+        f"{content_hash}{extension.lower()}"
+    )
+
+
+def content_addressed_upload_to(instance, filename):
+    extension = os.path.splitext(filename)[1]
+    return content_addressed_name(instance.content_hash, extension)
+
+
+class LinkingStorageMixin:
+    """
+    Saves an ImportedFile by linking it into storage. Other content is
+    saved as usual.
+    """
+
+    def _save(self, name, content):
+        source_path = getattr(content, "source_path", None)
+        if source_path is None:
+            return super()._save(name, content)
+
+        full_path = self.path(name)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        while True:
+            try:
+                link_or_copy(source_path, full_path)
+            except FileExistsError:
+                name = self.get_available_name(name)
+                full_path = self.path(name)
+            else:
+                break
+
+        if self.file_permissions_mode is not None:
+            os.chmod(full_path, self.file_permissions_mode)
+        name = os.path.relpath(full_path, self.location)
+        return str(name).replace("\\", "/")
+
+
+@deconstructible
+class LinkingFileSystemStorage(LinkingStorageMixin, FileSystemStorage):
+    pass
+
+
+@deconstructible
+class ContentAddressedStorage(LinkingStorageMixin, FileSystemStorage):
+    """
+    Stores files under names derived from their content hash.
+
+    Same name means same bytes, so an existing file is reused instead of
+    being written again under a suffixed name.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        return name
+
+    def _save(self, name, content):
+        if self.exists(name):
+            return name
+
+        # Parallel importers may write the same asset at once. Each one
+        # writes a private temp file and renames it over the final name.
+        directory, file_name = os.path.split(name)
+        temp_name = super()._save(
+            os.path.join(directory, f".{uuid.uuid4().hex}.{file_name}"),
+            content,
+        )
+        os.replace(self.path(temp_name), self.path(name))
+        return name
+
+
+def field_file_to_sha256(field_file) -> str:
+    if not field_file._committed and isinstance(field_file.file, ImportedFile):
+        return field_file.file.sha256()
+
+    if field_file._committed:
+        with field_file.open("rb"):
+            return file_to_sha256(field_file)
+
+    field_file.seek(0)
+    content_hash = file_to_sha256(field_file)
+    field_file.seek(0)
+    return content_hash
@@ -0,0 +1,154 @@
+import collections
+import contextlib
+import math
+import resource
+import time
+import tracemalloc
+
+PROGRESS_INTERVAL_SECS = 1
+# Progress written to a log file instead of a terminal is kept sparse
+PROGRESS_LOG_INTERVAL_SECS = 30
+
+
+class StageTimer:
+    """
+    Wall time histogram of one stage, bucketed by powers of two
+    milliseconds.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total_secs = 0.0
+        self.max_secs = 0.0
+        self.buckets = collections.Counter()
+
+    def add(self, secs):
+        self.count += 1
+        self.total_secs += secs
+        self.max_secs = max(self.max_secs, secs)
+        millis = secs * 1000
+        bucket = math.ceil(math.log2(millis)) if millis > 1 else 0
+        self.buckets[bucket] += 1
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "total_secs": round(self.total_secs, 3),
+            "mean_ms": round(self.total_secs * 1000 / max(self.count, 1), 3),
+            "max_ms": round(self.max_secs * 1000, 3),
+            "histogram_ms": {
+                f"<={2**bucket}": self.buckets[bucket]
+                for bucket in sorted(self.buckets)
+            },
+        }
+
+
+class ImportTelemetry:
+    def __init__(self):
+        self.reset()
+
+    def reset(self, total_rows=None, trace_memory=False, stream=None):
+        self.total_rows = total_rows
+        self.trace_memory = trace_memory
+        self.stream = stream
+        self.stages = collections.defaultdict(StageTimer)
+        self.counters = collections.Counter()
+        self.rows = 0
+        self.started_at = time.monotonic()
+        self.progress_at = 0.0
+
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name].add(time.perf_counter() - started_at)
+
+    def timed_iter(self, name, iterable):
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def row_done(self):
+        self.rows += 1
+        if self.stream is None:
+            return
+
+        now = time.monotonic()
+        interactive = self.stream.isatty()
+        interval = (
+            PROGRESS_INTERVAL_SECS
+            if interactive
+            else PROGRESS_LOG_INTERVAL_SECS
+        )
+        if now - self.progress_at < interval:
+            return
+
+        self.progress_at = now
+        end = "\r" if interactive else "\n"
+        print(self.progress_line(), end=end, file=self.stream, flush=True)
+
+    def progress_line(self) -> str:
+        elapsed = time.monotonic() - self.started_at
+        rate = self.rows / elapsed if elapsed else 0.0
+        line = f"{self.rows} rows, {rate:.1f} rows/s"
+
+        if self.total_rows:
+            remaining = max(self.total_rows - self.rows, 0)
+            eta = round(remaining / rate) if rate else None
+            line = (
+                f"{self.rows}/{self.total_rows} rows, {rate:.1f} rows/s, "
+                f"ETA {'?' if eta is None else _format_secs(eta)}"
+            )
+
+        return line
+
+    def summary(self, models=None) -> dict:
+        elapsed = time.monotonic() - self.started_at
+        summary = {
+            "rows": self.rows,
+            "elapsed_secs": round(elapsed, 3),
+            "rows_per_sec": round(self.rows / elapsed, 3) if elapsed else 0,
+            "stages": {
+                name: timer.summary()
+                for name, timer in sorted(self.stages.items())
+            },
+            "counters": dict(sorted(self.counters.items())),
+            "models": dict(sorted((models or {}).items())),
+            # Kilobytes on Linux
+            "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        }
+
+        if tracemalloc.is_tracing():
+            _, peak_bytes = tracemalloc.get_traced_memory()
+            summary["tracemalloc_peak_bytes"] = peak_bytes
+            if self.trace_memory:
+                tracemalloc.stop()
+
+        return summary
+
+    def finish_progress(self):
+        if self.stream is not None and self.stream.isatty():
+            print(self.progress_line(), file=self.stream, flush=True)
+
+
+def _format_secs(secs) -> str:
+    minutes, secs = divmod(int(secs), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02}:{secs:02}"
+
+
+# Shared by the importer and the helpers it calls. Each import run resets it.
+IMPORT_TELEMETRY = ImportTelemetry()
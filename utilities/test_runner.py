@@ -0,0 +1,189 @@
+import hashlib
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.db.migrations.loader import MigrationLoader
+from django.test.runner import DiscoverRunner
+
+SNAPSHOT_DUMP_PATH = settings.BASE_DIR / "brandscanner_db.sql"
+SNAPSHOT_TABLE = "test_snapshot"
+
+
+def snapshot_fingerprint() -> str:
+    """
+    Changes whenever a migration or the reference dump changes, which is
+    when the test database snapshot has to be rebuilt.
+    """
+    sha256 = hashlib.sha256()
+    loader = MigrationLoader(None, ignore_no_migrations=True)
+    for key, migration in sorted(loader.disk_migrations.items()):
+        sha256.update(repr(key).encode())
+        with open(sys.modules[migration.__module__].__file__, "rb") as f:
+            sha256.update(f.read())
+    with open(SNAPSHOT_DUMP_PATH, "rb") as f:
+        sha256.update(f.read())
+    return sha256.hexdigest()
+
+
+def data_checksum(connection, database_name) -> str:
+    """
+    Checksum of every row of the database but the snapshot table, so
+    that a TransactionTestCase flush or leftover writes are noticed.
+    """
+    qn = connection.ops.quote_name
+    with connection._nodb_cursor() as cursor:
+        cursor.execute(
+            "SELECT table_name FROM information_schema.tables "
+            "WHERE table_schema = %s AND table_type = 'BASE TABLE' "
+            "AND table_name != %s ORDER BY table_name",
+            [database_name, SNAPSHOT_TABLE],
+        )
+        tables = [row[0] for row in cursor.fetchall()]
+        cursor.execute(
+            "CHECKSUM TABLE "
+            + ", ".join(f"{qn(database_name)}.{qn(table)}" for table in tables)
+        )
+        # Rows are named after the database, which differs for clones
+        checksums = [str(row[1]) for row in cursor.fetchall()]
+    return hashlib.sha256(",".join(tables + checksums).encode()).hexdigest()
+
+
+def _snapshot_is_current(connection, database_name, fingerprint) -> bool:
+    qn = connection.ops.quote_name
+    try:
+        with connection._nodb_cursor() as cursor:
+            cursor.execute(
+                f"SELECT fingerprint, data_checksum FROM "
+                f"{qn(database_name)}.{qn(SNAPSHOT_TABLE)}"
+            )
+            row = cursor.fetchone()
+    except DatabaseError:
+        # No database or no snapshot in it
+        return False
+    return (
+        row is not None
+        and row[0] == fingerprint
+        and row[1] == data_checksum(connection, database_name)
+    )
+
+
+def _drop_database(connection, database_name):
+    qn = connection.ops.quote_name
+    with connection._nodb_cursor() as cursor:
+        cursor.execute(f"DROP DATABASE IF EXISTS {qn(database_name)}")
+
+
+class SnapshotTestRunner(DiscoverRunner):
+    """
+    Builds the MySQL test database once, with migrations applied and
+    brandscanner_db.sql loaded, and keeps it between runs. It is only
+    rebuilt when a migration or the dump changes, or when its data
+    changed, e.g. by the flush of a TransactionTestCase. Parallel runs
+    (--parallel) clone it per test process, and the clones are kept too.
+    """
+
+    def __init__(self, rebuild_snapshot=False, **kwargs):
+        super().__init__(**kwargs)
+        self.rebuild_snapshot = rebuild_snapshot
+
+    @classmethod
+    def add_arguments(cls, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            "--rebuild-snapshot",
+            action="store_true",
+            help="Rebuild the test database snapshot even if it is current.",
+        )
+
+    def setup_databases(self, **kwargs):
+        connection = connections[DEFAULT_DB_ALIAS]
+        aliases = kwargs.get("aliases")
+        if connection.vendor == "mysql" and (
+            aliases is None or DEFAULT_DB_ALIAS in aliases
+        ):
+            self.prepare_snapshot(connection)
+            # The snapshot and its clones are reused by the next run
+            self.keepdb = True
+        return super().setup_databases(**kwargs)
+
+    def prepare_snapshot(self, connection):
+        fingerprint = snapshot_fingerprint()
+        test_database_name = connection.creation._get_test_db_name()
+
+        rebuilt = self.rebuild_snapshot or not _snapshot_is_current(
+            connection, test_database_name, fingerprint
+        )
+        if rebuilt:
+            self.build_snapshot(connection, fingerprint)
+
+        # Clones of an older snapshot or with changed data are dropped and
+        # cloned again
+        for index in range(self.parallel if self.parallel > 1 else 0):
+            clone_name = connection.creation.get_test_db_clone_settings(
+                str(index + 1)
+            )["NAME"]
+            if rebuilt or not _snapshot_is_current(
+                connection, clone_name, fingerprint
+            ):
+                _drop_database(connection, clone_name)
+
+    def build_snapshot(self, connection, fingerprint):
+        alias = connection.alias
+        old_database_name = connection.settings_dict["NAME"]
+        if self.verbosity >= 1:
+            print(f"Building test database snapshot for alias '{alias}'...")
+
+        test_database_name = connection.creation.create_test_db(
+            verbosity=self.verbosity,
+            autoclobber=not self.interactive,
+            serialize=False,
+        )
+        try:
+            args, env = connection.client.settings_to_cmd_args_env(
+                connection.settings_dict, []
+            )
+            with open(SNAPSHOT_DUMP_PATH, "rb") as dump_file:
+                subprocess.run(
+                    args,
+                    stdin=dump_file,
+                    env={**os.environ, **env} if env else None,
+                    check=True,
+                )
+
+            # The dump may predate the latest migrations
+            call_command(
+                "migrate",
+                verbosity=max(self.verbosity - 1, 0),
+                interactive=False,
+                database=alias,
+            )
+
+            qn = connection.ops.quote_name
+            with connection.cursor() as cursor:
+                cursor.execute(f"DROP TABLE IF EXISTS {qn(SNAPSHOT_TABLE)}")
+                cursor.execute(
+                    f"CREATE TABLE {qn(SNAPSHOT_TABLE)} "
+                    "(fingerprint varchar(64) NOT NULL, "
+                    "data_checksum varchar(64) NOT NULL)"
+                )
+                cursor.execute(
+                    f"INSERT INTO {qn(SNAPSHOT_TABLE)} VALUES (%s, %s)",
+                    [
+                        fingerprint,
+                        data_checksum(connection, test_database_name),
+                    ],
+                )
+        except BaseException:
+            # A half built snapshot must not be kept
+            connection.close()
+            _drop_database(connection, test_database_name)
+            raise
+        finally:
+            # setup_databases switches to the test database again
+            connection.close()
+            connection.settings_dict["NAME"] = old_database_name
+            settings.DATABASES[alias]["NAME"] = old_database_name
@@ -1,21 +1,29 @@
 import csv
 import os
 
+CSV_SNIFF_SIZE = 4096
 
-def is_csv(csv_file_path) -> bool:
-    if csv_file_path is None:
+
+def is_existing_file(file_path) -> bool:
+    if file_path is None:
         print("CSV file not provided.")
         return False
 
-    if not os.path.isfile(csv_file_path):
-        print(f"CSV does not exist at path {csv_file_path}.")
+    if not os.path.isfile(file_path):
+        print(f"CSV does not exist at path {file_path}.")
         return False
 
+    return True
+
+
+def is_csv_file(csv_file) -> bool:
+    csv_file.seek(0)
     try:
-        with open(csv_file_path) as f:
-            csv.Sniffer().sniff(f.read(4096))
+        csv.Sniffer().sniff(csv_file.read(CSV_SNIFF_SIZE))
     except csv.Error:
         return False
+    finally:
+        csv_file.seek(0)
 
     return True
 
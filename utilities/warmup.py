@@ -0,0 +1,60 @@
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import caches
+from django.db import DatabaseError, connections
+from django.template import engines
+from django.template.loader import get_template
+from django.urls import get_resolver
+
+
+def project_template_names() -> [str]:
+    # Only templates of the project, not those of Django or its apps
+    template_names = []
+    for engine in engines.all():
+        for template_dir in engine.template_dirs:
+            template_dir = os.fspath(template_dir)
+            if not template_dir.startswith(os.fspath(settings.BASE_DIR)):
+                continue
+            for dir_path, _, file_names in os.walk(template_dir):
+                for file_name in file_names:
+                    if file_name.endswith(".html"):
+                        template_names.append(
+                            os.path.relpath(
+                                os.path.join(dir_path, file_name),
+                                template_dir,
+                            )
+                        )
+    return template_names
+
+
+def warm_up():
+    """
+    Does the work of a first request once, in the uWSGI master before it
+    forks, so that every worker starts with it done and shares the
+    memory copy-on-write.
+    """
+    # Imported here because the app registry is only ready now
+    from utilities.cache import cache_generation
+    from utilities.catalog import CATEGORY_TAGS
+
+    # Imports the urlconfs and builds the reverse lookup tables
+    get_resolver().reverse_dict
+
+    # Compiled templates stay in the cached template loader
+    for template_name in project_template_names():
+        get_template(template_name)
+
+    # ManifestStaticFilesStorage reads its manifest when created
+    getattr(staticfiles_storage, "hashed_files", None)
+
+    try:
+        CATEGORY_TAGS.load(cache_generation())
+    except (DatabaseError, OSError) as e:
+        # The first request loads them instead
+        print(f"Could not preload category tags: {e!r}")
+    finally:
+        # Forked workers must not share the master's connections
+        connections.close_all()
+        caches.close_all()